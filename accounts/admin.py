@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import Account
+from .models import Account, UserStats
 
 
 @admin.register(Account)
@@ -17,3 +17,14 @@ class AccountAdmin(UserAdmin):
         (None, {"fields": ("email", "username", "password")}),
         ("Permissions", {"fields": ("is_staff", "is_active", "is_superuser", "groups", "user_permissions")}),
     )
+
+
+@admin.register(UserStats)
+class UserStatsAdmin(admin.ModelAdmin):
+    list_display = ('user', 'orders_count', 'lifetime_spend', 'reviews_count', 'updated_at')
+    list_select_related = ('user',)
+    search_fields = ('user__email',)
+    readonly_fields = ('user', 'orders_count', 'lifetime_spend', 'reviews_count', 'updated_at')
+
+    def has_add_permission(self, request):
+        return False
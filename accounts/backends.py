@@ -0,0 +1,99 @@
+from typing import Optional
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import caches
+from django.http import HttpRequest
+from greatkart.cache import is_shared
+from .models import Account
+
+
+USER_CACHE_TIMEOUT: int = 60 * 5
+
+
+def _cache_alias() -> str:
+    return getattr(settings, 'USER_CACHE', 'default')
+
+
+def _cache():
+    return caches[_cache_alias()]
+
+
+def _cache_key(user_id: int) -> str:
+    return f'account:{user_id}'
+
+
+def invalidate_user(user_id: int) -> None:
+    """Drop the cached copy of a user."""
+    _cache().delete(_cache_key(user_id))
+
+
+class EmailBackend(ModelBackend):
+    """Authenticate users by email address, ignoring case, and load them through the cache.
+
+    The lookup goes through `Account.objects.filter_by_email`, which is served by the
+    index on `LOWER(email)`. When the `USER_CACHE` cache is shared between processes,
+    the user of each request is read from it, and is dropped from it whenever the
+    account is saved or deleted.
+    """
+
+    def authenticate(self, request: Optional[HttpRequest], username: str = None, password: str = None, **kwargs) -> Optional[Account]:
+        """Return the active user matching the email and password, or None.
+
+        Args:
+            request (HttpRequest, optional): The login request.
+            username (str, optional): The email address, as passed by `authenticate(username=...)`.
+            password (str, optional): The password.
+            **kwargs: May hold the email address as `email`.
+
+        Returns:
+            Optional[Account]: The authenticated user.
+        """
+        email = username if username is not None else kwargs.get(Account.USERNAME_FIELD)
+        if email is None or password is None:
+            return None
+
+        users = list(Account.objects.filter_by_email(email)[:2])
+        # Accounts registered before emails were compared without case may differ only in case
+        if len(users) > 1:
+            users = [user for user in users if user.email == email]
+
+        if len(users) != 1:
+            # Run the password hasher anyway to keep the timing of unknown emails the same
+            Account().set_password(password)
+            return None
+
+        user = users[0]
+        if user.check_password(password) and self.user_can_authenticate(user):
+            return user
+
+        return None
+
+    def get_user(self, user_id: int) -> Optional[Account]:
+        """Return the active user with an ID, from the cache when possible.
+
+        The cache is only used when it is shared between processes, otherwise a process
+        could keep serving a deactivated user or an old password hash after another one
+        saved the account. `AuthenticationMiddleware` compares the session auth hash with
+        the one of the returned user, and a password change saves the account, which
+        drops the shared cached copy, so changing the password logs out the other sessions.
+
+        Args:
+            user_id (int): The ID of the user.
+
+        Returns:
+            Optional[Account]: The user, or None if there is no such active user.
+        """
+        if not is_shared(_cache_alias()):
+            return super().get_user(user_id)
+
+        cache = _cache()
+        key = _cache_key(user_id)
+        user = cache.get(key)
+
+        if user is None:
+            user = Account.objects.filter(pk=user_id).first()
+            if user is None:
+                return None
+            cache.set(key, user, USER_CACHE_TIMEOUT)
+
+        return user if self.user_can_authenticate(user) else None
@@ -38,12 +38,14 @@ class RegistrationForm(forms.ModelForm):
         
     def clean_email(self):
         """Custom email validation that raises a validation error if the email already exists in the database.
+
+        Emails differing only in case are considered the same.
         
         Returns:
             email (str): The email address entered by the user.
         """
         email = self.cleaned_data['email']
-        if Account.objects.filter(email=email).exists():
+        if Account.objects.filter_by_email(email).exists():
             raise forms.ValidationError('This email is already in use.')
         return email
     
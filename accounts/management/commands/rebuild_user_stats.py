@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandParser
+from accounts.models import Account
+from accounts.stats import rebuild
+
+
+class Command(BaseCommand):
+    """Recompute the dashboard counters of users from their orders and reviews.
+
+    Use it to backfill the counters or to repair them after orders or reviews were
+    changed outside the views, e.g. in the admin.
+    """
+    help = 'Recompute the per-user dashboard counters.'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument('emails', nargs='*', help='Emails of the users to rebuild. Defaults to all users.')
+
+    def handle(self, *args, **options) -> None:
+        users = Account.objects.order_by('id')
+        if options['emails']:
+            users = users.filter(email__in=options['emails'])
+
+        rebuilt = 0
+        for user_id in users.values_list('id', flat=True).iterator():
+            rebuild(user_id)
+            rebuilt += 1
+
+        self.stdout.write(f'Rebuilt the stats of {rebuilt} users')
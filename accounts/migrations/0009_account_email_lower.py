@@ -0,0 +1,18 @@
+# Generated by Django 4.1.7 on 2026-10-19 00:56
+
+from django.db import migrations, models
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0008_userstats'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='account',
+            index=models.Index(django.db.models.functions.text.Lower('email'), name='accounts_account_email_lower'),
+        ),
+    ]
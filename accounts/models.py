@@ -1,10 +1,25 @@
 from django.db import models
+from django.db.models import QuerySet
+from django.db.models.functions import Lower
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin, BaseUserManager, User
 
 
 class MyAccountManager(BaseUserManager):
     """Django custom user model manager."""
 
+    def filter_by_email(self, email: str) -> QuerySet:
+        """Select the users with an email address, ignoring case.
+
+        Compares `LOWER(email)`, so the lookup uses the functional index on it.
+
+        Args:
+            email (str): The email address.
+
+        Returns:
+            QuerySet: The matching users.
+        """
+        return self.alias(email_lower=Lower('email')).filter(email_lower=email.strip().lower())
+
     def create_user(self, username: str, email: str, password: str = None) -> User:
         """Create and save a new user with the given email, username, and password.
 
@@ -95,4 +110,34 @@ class Account(AbstractBaseUser, PermissionsMixin):
     class Meta:
         verbose_name = 'User'
         verbose_name_plural = 'Users'
+        indexes = [
+            models.Index(Lower('email'), name='accounts_account_email_lower'),
+        ]
+
+
 
+class UserStats(models.Model):
+    """Per-user counters shown on the account dashboard.
+
+    Kept up to date by `accounts.stats` when orders are paid and reviews are written, so
+    the dashboard does not have to aggregate the orders and reviews of the user.
+
+    Attributes:
+        user (Account): The user the counters belong to.
+        orders_count (int): The number of paid orders, archived ones included.
+        lifetime_spend (Decimal): The total of the paid orders.
+        reviews_count (int): The number of reviews written.
+        updated_at (datetime): The datetime when the counters last changed.
+    """
+    user = models.OneToOneField(Account, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    orders_count = models.PositiveIntegerField(default=0)
+    lifetime_spend = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    reviews_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'Stats of {self.user_id}'
+
+    class Meta:
+        verbose_name = 'User stats'
+        verbose_name_plural = 'User stats'
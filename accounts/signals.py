@@ -0,0 +1,13 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .backends import invalidate_user
+from .models import Account
+
+
+@receiver(post_save, sender=Account)
+@receiver(post_delete, sender=Account)
+def account_changed(sender, instance: Account, **kwargs) -> None:
+    """Drop the cached copy of a user once the change is committed."""
+    user_id = instance.pk
+    transaction.on_commit(lambda: invalidate_user(user_id))
@@ -0,0 +1,127 @@
+from decimal import Decimal
+from typing import Dict
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from greatkart.cache import is_shared
+from orders.models import ArchivedOrder, Order
+from promotions.engine import CENT
+from store.models import ReviewRating
+from .models import UserStats
+
+
+CACHE_TIMEOUT: int = 60 * 5
+
+
+def _cache_alias() -> str:
+    return getattr(settings, 'USER_STATS_CACHE', 'default')
+
+
+def _cache():
+    return caches[_cache_alias()]
+
+
+def _cache_key(user_id: int) -> str:
+    return f'userstats:{user_id}'
+
+
+def compute(user_id: int) -> Dict[str, object]:
+    """Aggregate the counters of a user from the orders and reviews tables.
+
+    Args:
+        user_id (int): The ID of the user.
+
+    Returns:
+        Dict[str, object]: The `orders_count`, `lifetime_spend` and `reviews_count` of the user.
+    """
+    orders_count, lifetime_spend = 0, Decimal('0.00')
+
+    for model in (Order, ArchivedOrder):
+        totals = model.objects.filter(user_id=user_id, is_ordered=True).aggregate(count=Count('id'), spend=Sum('order_total'))
+        orders_count += totals['count'] or 0
+        lifetime_spend += totals['spend'] or 0
+
+    return {
+        'orders_count': orders_count,
+        'lifetime_spend': lifetime_spend.quantize(CENT),
+        'reviews_count': ReviewRating.objects.filter(user_id=user_id).count(),
+    }
+
+
+def rebuild(user_id: int) -> UserStats:
+    """Recompute and store the counters of a user.
+
+    Args:
+        user_id (int): The ID of the user.
+
+    Returns:
+        UserStats: The stored counters.
+    """
+    stats, _ = UserStats.objects.update_or_create(user_id=user_id, defaults=compute(user_id))
+    invalidate(user_id)
+    return stats
+
+
+def get_user_stats(user_id: int) -> UserStats:
+    """Return the counters of a user, from the cache when possible.
+
+    Falls back to the stored counters, and computes them the first time a user is seen.
+    The cache is only used when it is shared between processes, since orders paid by the
+    task worker must invalidate the copy read by the web processes.
+
+    Args:
+        user_id (int): The ID of the user.
+
+    Returns:
+        UserStats: The counters.
+    """
+    shared = is_shared(_cache_alias())
+    stats = _cache().get(_cache_key(user_id)) if shared else None
+
+    if stats is None:
+        stats = UserStats.objects.filter(user_id=user_id).first()
+        if stats is None:
+            stats, _ = UserStats.objects.get_or_create(user_id=user_id, defaults=compute(user_id))
+        if shared:
+            _cache().set(_cache_key(user_id), stats, CACHE_TIMEOUT)
+
+    return stats
+
+
+def _increment(user_id: int, **changes) -> None:
+    """Add to the counters of a user and drop the cached copy once the transaction commits.
+
+    Users without stored counters yet get them computed instead, which already includes
+    the change when it was written in the current transaction.
+    """
+    updated = UserStats.objects.filter(user_id=user_id).update(**{field: F(field) + value for field, value in changes.items()})
+
+    if not updated:
+        UserStats.objects.get_or_create(user_id=user_id, defaults=compute(user_id))
+
+    transaction.on_commit(lambda: invalidate(user_id))
+
+
+def record_order(user_id: int, amount: Decimal) -> None:
+    """Count a paid order of a user.
+
+    Args:
+        user_id (int): The ID of the user.
+        amount (Decimal): The order total.
+    """
+    _increment(user_id, orders_count=1, lifetime_spend=amount)
+
+
+def record_review(user_id: int) -> None:
+    """Count a new review of a user.
+
+    Args:
+        user_id (int): The ID of the user.
+    """
+    _increment(user_id, reviews_count=1)
+
+
+def invalidate(user_id: int) -> None:
+    """Drop the cached counters of a user."""
+    _cache().delete(_cache_key(user_id))
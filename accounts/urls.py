@@ -10,4 +10,5 @@ urlpatterns = [
     path('', views.dashboard_view, name='dashboard'),
     path('my_orders/', views.my_orders_view, name='my_orders'),
     path('order_detail/<int:order_id>/', views.order_detail_view, name='order_detail'),
+    path('order_detail/<int:order_id>/reorder/', views.reorder_view, name='reorder'),
 ]
\ No newline at end of file
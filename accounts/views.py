@@ -3,14 +3,21 @@ from django.http import HttpRequest, HttpResponse
 from django.contrib import messages, auth
 from django.contrib.auth import authenticate
 from django.contrib.auth.decorators import login_required
+from django.views.decorators.http import require_POST
 from .forms import RegistrationForm
 from .models import Account
-from orders.models import Order, OrderProduct
-from carts.models import Cart, CartItem
-from carts.views import _cart_id
+from mailer.service import queue_email
+from .stats import get_user_stats
+from orders.archive import get_user_order, user_order_history
+from carts.views import _merge_guest_cart, _resolve_cart_entries, _add_items_to_cart
 import requests
 
 
+ORDERS_PER_PAGE: int = 20
+ORDER_SUMMARY_FIELDS = ('id', 'order_number', 'first_name', 'last_name', 'phone', 'order_total',
+                        'item_count', 'thumbnail', 'created_at')
+
+
 def registration_view(request: HttpRequest) -> HttpResponse:
     """Handle user registration requests.
 
@@ -28,7 +35,7 @@ def registration_view(request: HttpRequest) -> HttpResponse:
         password = form.cleaned_data.get('password')
 
         new_user = Account.objects.create_user(username, email, password)
-        new_user.save()
+        queue_email('emails/registration', 'Welcome to GreatKart', [new_user.email], {'user': new_user})
 
         messages.success(request, 'You have been registred.')
         return redirect('login')
@@ -55,43 +62,7 @@ def login_view(request: HttpRequest) -> HttpResponse:
         user = authenticate(email=email, password=password)
 
         if user:
-            try:
-                cart = Cart.objects.get(cart_id=_cart_id(request))
-                is_cart_item_exists = CartItem.objects.filter(cart=cart).exists()
-
-                if is_cart_item_exists:
-                    cart_item = CartItem.objects.filter(cart=cart)
-
-                    # getting the product variation by cart id
-                    product_variation = []
-                    for item in cart_item:
-                        variation = item.variation.all()
-                        product_variation.append(list(variation))
-
-                    # getting the cart_items from the user to access his product variations
-                    cart_item = CartItem.objects.filter(user=user)
-                    ex_var_list = []
-                    id_list = []
-                    for item in cart_item:
-                        existing_variation = item.variation.all()
-                        ex_var_list.append(list(existing_variation))
-                        id_list.append(item.id)
-
-                    for pr in product_variation:
-                        if pr in ex_var_list:
-                            index = ex_var_list.index(pr)
-                            item_id = id_list[index]
-                            item = CartItem.objects.get(id=item_id)
-                            item.quantity += 1
-                            item.user = user
-                            item.save()
-                        else:
-                            cart_item = CartItem.objects.filter(cart=cart)
-                            for item in cart_item:
-                                item.user = user
-                                item.save()
-            except Exception as e:
-                print(e)
+            _merge_guest_cart(request.session.session_key, user)
 
             auth.login(request, user)
             url = request.META.get('HTTP_REFERER')
@@ -130,6 +101,9 @@ def logout_view(request: HttpRequest) -> HttpResponse:
 def dashboard_view(request: HttpRequest) -> HttpResponse:
     """Dashboard view.
 
+    Renders the counters kept in `UserStats`, which are cached, so no orders or reviews
+    are aggregated. The cart size comes from the `cart_count` of the cart context processor.
+
     Args:
         request (HttpRequest): HTTP request.
 
@@ -137,10 +111,11 @@ def dashboard_view(request: HttpRequest) -> HttpResponse:
         HttpResponse: HTTP response.
 
     """
-    orders = Order.objects.filter(user_id=request.user.id, is_ordered=True)
-    orders_count = orders.count()
+    stats = get_user_stats(request.user.id)
     context = {
-        'orders_count': orders_count
+        'orders_count': stats.orders_count,
+        'lifetime_spend': stats.lifetime_spend,
+        'reviews_count': stats.reviews_count,
     }
     return render(request, 'accounts/dashboard.html', context)
 
@@ -149,6 +124,9 @@ def dashboard_view(request: HttpRequest) -> HttpResponse:
 def my_orders_view(request: HttpRequest) -> HttpResponse:
     """My orders view.
 
+    Lists the paid orders of the user newest first, archived ones included, `ORDERS_PER_PAGE`
+    at a time, using the summary stored on each order so no order lines are loaded.
+
     Args:
         request (HttpRequest): HTTP request.
 
@@ -156,10 +134,17 @@ def my_orders_view(request: HttpRequest) -> HttpResponse:
         HttpResponse: HTTP response.
 
     """
-    orders = Order.objects.filter(user_id=request.user.id, is_ordered=True).order_by('-created_at')
+    # Keyset pagination, the next page starts below the last order id of this page
+    before = request.GET.get('before')
+    before = int(before) if before and before.isdigit() else None
+
+    orders = user_order_history(request.user.id, ORDER_SUMMARY_FIELDS, ORDERS_PER_PAGE + 1, before)
+    next_before = orders[ORDERS_PER_PAGE - 1].id if len(orders) > ORDERS_PER_PAGE else None
 
     context = {
-        'orders': orders,
+        'orders': orders[:ORDERS_PER_PAGE],
+        'next_before': next_before,
+        'is_first_page': not before,
     }
     return render(request, 'accounts/my_orders.html', context)
 
@@ -175,16 +160,42 @@ def order_detail_view(request: HttpRequest, order_id: str) -> HttpResponse:
     Returns:
         HttpResponse: HTTP response.
     """
-    order_detail = OrderProduct.objects.filter(order__order_number=order_id)
-    order = Order.objects.get(order_number=order_id)
-    sub_total = 0
-
-    for item in order_detail:
-        sub_total += item.product_price * item.quantity
-
+    order = get_user_order(request.user, order_id)
+    order_detail = order.lines().select_related('product').prefetch_related('variation')
     context = {
         'order_detail': order_detail,
         'order': order,
-        'sub_total': sub_total,
+        'sub_total': order.sub_total,
     }
     return render(request, 'accounts/order_detail.html', context)
+
+
+@login_required(login_url='login')
+@require_POST
+def reorder_view(request: HttpRequest, order_id: str) -> HttpResponse:
+    """Add all products of a past order to the cart in one batch.
+
+    Args:
+        request (HttpRequest): HTTP request.
+        order_id (str): Order ID.
+
+    Returns:
+        HttpResponse: Redirect to the cart page, or back to the order if nothing could be added.
+    """
+    order_products = get_user_order(request.user, order_id).lines().prefetch_related('variation')
+
+    try:
+        entries = _resolve_cart_entries(
+            (item.product_id, [variation.id for variation in item.variation.all()], item.quantity)
+            for item in order_products
+        )
+    except ValueError as e:
+        messages.error(request, str(e))
+        return redirect('order_detail', order_id=order_id)
+
+    if not entries:
+        messages.error(request, 'This order has no products to reorder.')
+        return redirect('order_detail', order_id=order_id)
+
+    _add_items_to_cart(request, entries)
+    return redirect('cart')
@@ -0,0 +1,293 @@
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.db.models import Case, F, Q, QuerySet, Sum, Value, When
+from django.utils.module_loading import import_string
+from greatkart.cache import is_shared
+from .models import CartItem
+
+
+class DatabaseCartStore:
+    """Cart store writing every quantity change straight to the `CartItem` table.
+
+    Cart owners are identified by a string key such as `user:1` or `cart:42`,
+    see `carts.views._owner_key`.
+    """
+
+    def adjust(self, owner_key: str, item: CartItem, delta: int) -> Optional[CartItem]:
+        """Change the quantity of a cart item, deleting it when the quantity drops to zero.
+
+        Args:
+            owner_key (str): The key of the cart owner.
+            item (CartItem): The cart item to change.
+            delta (int): The quantity to add, negative to decrease.
+
+        Returns:
+            Optional[CartItem]: The updated cart item, or None if it was deleted.
+        """
+        item.quantity += delta
+
+        if item.quantity <= 0:
+            item.delete()
+            return None
+
+        CartItem.objects.filter(id=item.id).update(quantity=F('quantity') + delta)
+        return item
+
+    def remove(self, owner_key: str, item: CartItem) -> None:
+        """Delete a cart item.
+
+        Args:
+            owner_key (str): The key of the cart owner.
+            item (CartItem): The cart item to delete.
+        """
+        item.delete()
+
+    def created(self, owner_key: str, item: CartItem) -> None:
+        """Notify the store that a new cart item row was inserted.
+
+        Args:
+            owner_key (str): The key of the cart owner.
+            item (CartItem): The new cart item.
+        """
+
+    def apply(self, owner_key: str, items: Iterable[CartItem]) -> List[CartItem]:
+        """Overlay pending quantity changes on cart items loaded from the database.
+
+        Args:
+            owner_key (str): The key of the cart owner.
+            items (Iterable[CartItem]): The cart items loaded from the database.
+
+        Returns:
+            List[CartItem]: The cart items with their current quantities, deleted items removed.
+        """
+        return list(items)
+
+    def count(self, owner_key: str, queryset: QuerySet) -> int:
+        """Count the products in a cart.
+
+        Args:
+            owner_key (str): The key of the cart owner.
+            queryset (QuerySet): The cart items of the owner.
+
+        Returns:
+            int: The sum of the quantities of the cart items.
+        """
+        return queryset.aggregate(count=Sum('quantity'))['count'] or 0
+
+    def flush(self, owner_keys: Optional[Iterable[str]] = None) -> int:
+        """Write pending quantity changes to the database.
+
+        Args:
+            owner_keys (Iterable[str], optional): Only flush these owners. Defaults to all dirty owners.
+
+        Returns:
+            int: The number of flushed cart items.
+        """
+        return 0
+
+    def invalidate(self, owner_key: str) -> None:
+        """Drop cached state of an owner after its cart items were changed in the database directly.
+
+        Args:
+            owner_key (str): The key of the cart owner.
+        """
+
+
+class CachedCartStore(DatabaseCartStore):
+    """Write-behind cart store keeping quantity changes in a shared Django cache.
+
+    Each quantity change is added with an atomic `incr` to a pending delta kept per cart
+    item, so concurrent clicks on the same line are all counted. The first change of an
+    item since it was last flushed also appends the item to a dirty log, an atomically
+    numbered sequence of cache keys. `flush` applies the logged deltas to `CartItem` in
+    batches and subtracts what it applied, again with `incr`. It is run periodically by
+    the `flush_cart_store` command and synchronously for an owner before checkout. New
+    lines are inserted and removed lines deleted right away.
+
+    The pending deltas must be visible to every web and worker process, so the cache
+    has to be shared between them, e.g. Redis.
+
+    Settings:
+        CART_STORE_CACHE (str): The cache alias to use. Defaults to `default`.
+        CART_STORE_TIMEOUT (int): Seconds cached state is kept. Defaults to 14 days.
+        CART_STORE_BATCH_SIZE (int): Number of cart items flushed per transaction. Defaults to 100.
+
+    Raises:
+        ImproperlyConfigured: If the cache is private to the process.
+    """
+    SEQUENCE_KEY = 'cartstore:log:last'
+    CURSOR_KEY = 'cartstore:log:flushed'
+    LOCK_KEY = 'cartstore:flush:lock'
+    LOCK_TIMEOUT = 60
+
+    def __init__(self) -> None:
+        alias = getattr(settings, 'CART_STORE_CACHE', 'default')
+        if not is_shared(alias):
+            raise ImproperlyConfigured(f'CachedCartStore needs a cache shared between processes, "{alias}" is not.')
+
+        self.cache = caches[alias]
+        self.timeout = getattr(settings, 'CART_STORE_TIMEOUT', 60 * 60 * 24 * 14)
+        self.batch_size = getattr(settings, 'CART_STORE_BATCH_SIZE', 100)
+
+    def _delta_key(self, item_id: int) -> str:
+        return f'cartstore:delta:{item_id}'
+
+    def _dirty_key(self, item_id: int) -> str:
+        return f'cartstore:dirty:{item_id}'
+
+    def _log_key(self, number: int) -> str:
+        return f'cartstore:log:{number}'
+
+    def _count_key(self, owner_key: str) -> str:
+        return f'cartstore:count:{owner_key}'
+
+    def _incr(self, key: str, delta: int, timeout: Optional[int]) -> int:
+        """Atomically add to a counter, creating it when missing."""
+        self.cache.add(key, 0, timeout)
+        try:
+            return self.cache.incr(key, delta)
+        except ValueError:
+            # The key expired between add and incr
+            self.cache.add(key, 0, timeout)
+            return self.cache.incr(key, delta)
+
+    def _incr_count(self, owner_key: str, delta: int) -> None:
+        """Update a cached cart count, leaving it to be computed when it is not cached."""
+        try:
+            self.cache.incr(self._count_key(owner_key), delta)
+        except ValueError:
+            pass
+
+    def _mark_dirty(self, item_id: int) -> None:
+        """Append an item to the dirty log unless it is already waiting in it."""
+        if self.cache.add(self._dirty_key(item_id), 1, self.timeout):
+            number = self._incr(self.SEQUENCE_KEY, 1, None)
+            self.cache.set(self._log_key(number), item_id, self.timeout)
+
+    def adjust(self, owner_key: str, item: CartItem, delta: int) -> Optional[CartItem]:
+        """Record a quantity change of a cart item loaded from the database."""
+        pending = self._incr(self._delta_key(item.id), delta, self.timeout)
+        self._mark_dirty(item.id)
+        self._incr_count(owner_key, delta)
+
+        item.quantity += pending
+        return item if item.quantity > 0 else None
+
+    def remove(self, owner_key: str, item: CartItem) -> None:
+        quantity = item.quantity + (self.cache.get(self._delta_key(item.id)) or 0)
+        item.delete()
+        self.cache.delete(self._delta_key(item.id))
+        self._incr_count(owner_key, -max(quantity, 0))
+
+    def created(self, owner_key: str, item: CartItem) -> None:
+        self._incr_count(owner_key, item.quantity)
+
+    def apply(self, owner_key: str, items: Iterable[CartItem]) -> List[CartItem]:
+        items = list(items)
+        deltas = self.cache.get_many([self._delta_key(item.id) for item in items])
+        result = []
+
+        for item in items:
+            item.quantity += deltas.get(self._delta_key(item.id), 0)
+            if item.quantity > 0:
+                result.append(item)
+
+        return result
+
+    def count(self, owner_key: str, queryset: QuerySet) -> int:
+        count_key = self._count_key(owner_key)
+        count = self.cache.get(count_key)
+
+        if count is None:
+            count = sum(item.quantity for item in self.apply(owner_key, queryset.only('id', 'quantity')))
+            self.cache.add(count_key, count, self.timeout)
+
+        return count
+
+    def _flush_items(self, item_ids: Iterable[int]) -> int:
+        """Apply the pending deltas of cart items to the database.
+
+        The dirty markers are cleared first, so changes made while the batch is written
+        log the items again. Applied deltas are subtracted rather than deleted, keeping
+        changes made in the meantime, and only once the write commits. When called inside
+        a transaction the items are logged again, so their deltas are still flushed later
+        if it rolls back.
+        """
+        item_ids = set(item_ids)
+        self.cache.delete_many([self._dirty_key(item_id) for item_id in item_ids])
+
+        values = self.cache.get_many([self._delta_key(item_id) for item_id in item_ids])
+        deltas = {item_id: values[self._delta_key(item_id)] for item_id in item_ids if values.get(self._delta_key(item_id))}
+        if not deltas:
+            return 0
+
+        in_transaction = transaction.get_connection().in_atomic_block
+
+        with transaction.atomic():
+            CartItem.objects.filter(id__in=deltas).update(quantity=F('quantity') + Case(
+                *[When(id=item_id, then=Value(delta)) for item_id, delta in deltas.items()],
+                default=Value(0),
+            ))
+            CartItem.objects.filter(id__in=deltas, quantity__lte=0).delete()
+            transaction.on_commit(lambda: self._subtract(deltas))
+
+        if in_transaction:
+            for item_id in deltas:
+                self._mark_dirty(item_id)
+
+        return len(deltas)
+
+    def _subtract(self, deltas: Dict[int, int]) -> None:
+        """Subtract deltas written to the database from the pending ones."""
+        for item_id, delta in deltas.items():
+            self._incr(self._delta_key(item_id), -delta, self.timeout)
+
+    def _owner_item_ids(self, owner_keys: Iterable[str]) -> List[int]:
+        """Return the IDs of the cart items of owners, see `carts.views._owner_key`."""
+        lookups = Q(pk__in=[])
+        for owner_key in owner_keys:
+            kind, owner_id = owner_key.split(':')
+            lookups |= Q(**{f'{kind}_id': int(owner_id)})
+
+        return list(CartItem.objects.filter(lookups).values_list('id', flat=True))
+
+    def flush(self, owner_keys: Optional[Iterable[str]] = None) -> int:
+        if owner_keys is not None:
+            item_ids = self._owner_item_ids(owner_keys)
+            return sum(self._flush_items(item_ids[start:start + self.batch_size])
+                       for start in range(0, len(item_ids), self.batch_size))
+
+        # Only one process works through the dirty log at a time
+        if not self.cache.add(self.LOCK_KEY, 1, self.LOCK_TIMEOUT):
+            return 0
+
+        flushed = 0
+        try:
+            cursor = self.cache.get(self.CURSOR_KEY, 0)
+            last = self.cache.get(self.SEQUENCE_KEY, 0)
+
+            while cursor < last:
+                batch_end = min(cursor + self.batch_size, last)
+                log_keys = [self._log_key(number) for number in range(cursor + 1, batch_end + 1)]
+                flushed += self._flush_items(self.cache.get_many(log_keys).values())
+
+                self.cache.delete_many(log_keys)
+                self.cache.set(self.CURSOR_KEY, batch_end, None)
+                cursor = batch_end
+        finally:
+            self.cache.delete(self.LOCK_KEY)
+
+        return flushed
+
+    def invalidate(self, owner_key: str) -> None:
+        self.cache.delete(self._count_key(owner_key))
+
+
+@lru_cache(maxsize=None)
+def get_cart_store() -> DatabaseCartStore:
+    """Return the cart store configured by the `CART_STORE` setting."""
+    return import_string(getattr(settings, 'CART_STORE', 'carts.backends.DatabaseCartStore'))()
@@ -1,23 +1,10 @@
 from django.http import HttpRequest
-from .models import Cart, CartItem
-from .views import _cart_id
 
 
 def counter(request: HttpRequest):
     cart_count = 0
 
     if 'admin' not in request.path:
-        try:
-            cart = Cart.objects.filter(cart_id=_cart_id(request))
-
-            if request.user.is_authenticated:
-                cart_items = CartItem.objects.filter(user=request.user)
-            else:
-                cart_items = CartItem.objects.filter(cart=cart[:1])
-
-            for cart_item in cart_items:
-                cart_count += cart_item.quantity
-        except Cart.DoesNotExist:
-            cart_count = 0
+        cart_count = request.cart.count
     
-    return dict(cart_count=cart_count)
+    return dict(cart_count=cart_count)
\ No newline at end of file
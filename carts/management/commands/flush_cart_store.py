@@ -0,0 +1,36 @@
+import time
+from django.core.management.base import BaseCommand, CommandParser
+from carts.backends import get_cart_store
+
+
+FLUSH_INTERVAL: float = 5.0
+
+
+class Command(BaseCommand):
+    """Write pending cart changes of the cart store to the database.
+
+    Runs once by default, or as a worker process with `--loop`.
+    """
+    help = 'Write pending cart changes of the cart store to the database.'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument('--loop', action='store_true',
+                            help='Keep flushing every --interval seconds.')
+        parser.add_argument('--interval', type=float, default=FLUSH_INTERVAL,
+                            help='Seconds between flushes when running with --loop.')
+
+    def handle(self, *args, **options) -> None:
+        store = get_cart_store()
+
+        while True:
+            started = time.monotonic()
+            flushed = store.flush()
+            elapsed = (time.monotonic() - started) * 1000
+
+            if flushed or not options['loop']:
+                self.stdout.write(f'Flushed {flushed} cart items in {elapsed:.1f} ms')
+
+            if not options['loop']:
+                break
+
+            time.sleep(options['interval'])
@@ -0,0 +1,92 @@
+import time
+from datetime import timedelta
+from django.contrib.admin.models import LogEntry
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand, CommandParser
+from django.db import transaction
+from django.db.models import QuerySet
+from django.utils import timezone
+from carts.models import Cart
+
+
+CART_RETENTION_DAYS: int = 30
+LOG_ENTRY_RETENTION_DAYS: int = 180
+BATCH_SIZE: int = 500
+BATCH_SLEEP: float = 0.1
+
+
+class Command(BaseCommand):
+    """Delete stale anonymous carts, expired sessions and old admin log entries.
+
+    Rows are deleted in small batches, each in its own short transaction, so the
+    command can run on a schedule against a busy database without holding long locks.
+    """
+    help = 'Delete stale anonymous carts, expired sessions and old admin log entries in batches.'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument('--cart-days', type=int, default=CART_RETENTION_DAYS,
+                            help='Delete anonymous carts created more than this many days ago.')
+        parser.add_argument('--log-days', type=int, default=LOG_ENTRY_RETENTION_DAYS,
+                            help='Delete admin log entries older than this many days.')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                            help='Maximum number of rows deleted per batch.')
+        parser.add_argument('--sleep', type=float, default=BATCH_SLEEP,
+                            help='Seconds to pause between batches.')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only report how many rows would be deleted.')
+
+    def handle(self, *args, **options) -> None:
+        now = timezone.now()
+
+        # Carts still holding items of a logged in user are kept
+        carts = (Cart.objects
+                 .filter(date_added__lt=(now - timedelta(days=options['cart_days'])).date())
+                 .exclude(cartitem__user__isnull=False)
+                 .order_by('date_added'))
+        sessions = Session.objects.filter(expire_date__lt=now).order_by('expire_date')
+        log_entries = LogEntry.objects.filter(action_time__lt=now - timedelta(days=options['log_days'])).order_by('pk')
+
+        for label, queryset in (('carts', carts), ('sessions', sessions), ('log entries', log_entries)):
+            if options['dry_run']:
+                self.stdout.write(f'{label}: {queryset.count()} rows would be deleted')
+            else:
+                self.purge(label, queryset, options['batch_size'], options['sleep'])
+
+    def purge(self, label: str, queryset: QuerySet, batch_size: int, sleep: float) -> int:
+        """Delete the rows of a queryset in batches of primary keys.
+
+        Args:
+            label (str): The name used in the progress report.
+            queryset (QuerySet): The rows to delete, ordered along an indexed column.
+            batch_size (int): Maximum number of rows deleted per batch.
+            sleep (float): Seconds to pause between batches.
+
+        Returns:
+            int: The total number of deleted rows, including cascaded ones.
+        """
+        total = 0
+        batch = 0
+
+        while True:
+            started = time.monotonic()
+
+            with transaction.atomic():
+                pks = list(queryset.values_list('pk', flat=True)[:batch_size])
+
+                if not pks:
+                    break
+
+                deleted, _ = queryset.model.objects.filter(pk__in=pks).delete()
+
+            batch += 1
+            total += deleted
+            elapsed = (time.monotonic() - started) * 1000
+            self.stdout.write(f'{label}: batch {batch} deleted {deleted} rows in {elapsed:.1f} ms')
+
+            if len(pks) < batch_size:
+                break
+
+            time.sleep(sleep)
+
+        self.stdout.write(self.style.SUCCESS(f'{label}: {total} rows deleted'))
+        return total
@@ -0,0 +1,102 @@
+from typing import Any, Callable, Dict, List, Optional
+from django.http import HttpRequest, HttpResponse
+from .backends import get_cart_store
+from .models import Cart, CartItem
+from .views import _cart_owner, _owner_key
+
+
+_UNRESOLVED = object()
+
+
+class RequestCart:
+    """The cart of the visitor of a request, resolved lazily and at most once.
+
+    Views and context processors share it through `request.cart`, so a page showing the
+    cart and the cart badge loads the cart and its lines once. Code changing the cart
+    calls `invalidate` so later reads in the same request see the change.
+
+    Attributes:
+        request (HttpRequest): The request the cart belongs to.
+    """
+
+    def __init__(self, request: HttpRequest) -> None:
+        self.request = request
+        self.invalidate()
+
+    def invalidate(self) -> None:
+        """Forget the resolved owner and loaded lines."""
+        self._owner = _UNRESOLVED
+        self._items = None
+        self._count = None
+
+    @property
+    def owner(self) -> Optional[Dict[str, Any]]:
+        """The lookup kwargs of the cart items, see `_cart_owner`, or None if the guest has no cart."""
+        if self._owner is _UNRESOLVED:
+            try:
+                self._owner = _cart_owner(self.request)
+            except Cart.DoesNotExist:
+                self._owner = None
+
+        return self._owner
+
+    @property
+    def items(self) -> List[CartItem]:
+        """The active cart items with their products and variations, pending store changes applied."""
+        if self._items is None:
+            owner = self.owner
+
+            if owner is None:
+                self._items = []
+            else:
+                cart_items = (CartItem.objects.filter(is_active=True, **owner)
+                              .select_related('product', 'product__category')
+                              .prefetch_related('variation'))
+                self._items = get_cart_store().apply(_owner_key(owner), cart_items)
+
+        return self._items
+
+    @property
+    def count(self) -> int:
+        """The number of products in the cart, shown in the cart badge.
+
+        Reuses the loaded lines when a view already needed them, otherwise asks the cart
+        store, which may answer from the cache.
+        """
+        if self._count is None:
+            owner = self.owner
+
+            if owner is None:
+                self._count = 0
+            elif self._items is not None:
+                self._count = sum(item.quantity for item in self._items)
+            else:
+                self._count = get_cart_store().count(_owner_key(owner), CartItem.objects.filter(**owner))
+
+        return self._count
+
+    def contains(self, product_id: int) -> bool:
+        """Whether a product is in the cart.
+
+        Args:
+            product_id (int): The ID of the product.
+
+        Returns:
+            bool: True if any cart line holds the product.
+        """
+        return any(item.product_id == product_id for item in self.items)
+
+
+class CartMiddleware:
+    """Attach a lazy `RequestCart` to each request as `request.cart`.
+
+    Must come after `AuthenticationMiddleware`, since the cart of a logged in user is
+    selected by `request.user`.
+    """
+
+    def __init__(self, get_response: Callable) -> None:
+        self.get_response = get_response
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        request.cart = RequestCart(request)
+        return self.get_response(request)
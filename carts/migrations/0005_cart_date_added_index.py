@@ -0,0 +1,18 @@
+# Generated by Django 4.1.7 on 2026-10-19 00:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('carts', '0004_alter_cart_id_alter_cartitem_id'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='cart',
+            name='date_added',
+            field=models.DateField(auto_now_add=True, db_index=True),
+        ),
+    ]
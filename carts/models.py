@@ -11,7 +11,7 @@ class Cart(models.Model):
         date_added (datetime): The datetime when the shopping cart was created.
     """
     cart_id = models.CharField(max_length=255, blank=True)
-    date_added = models.DateField(auto_now_add=True)
+    date_added = models.DateField(auto_now_add=True, db_index=True)
 
     def __str__(self):
         return self.cart_id
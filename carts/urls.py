@@ -8,4 +8,9 @@ urlpatterns = [
     path('remove_cart/<int:product_id>/<int:cart_item_id>/', views.remove_cart, name='remove_cart'),
     path('remove_cart_item/<int:product_id>/<int:cart_item_id>/', views.remove_cart_item, name='remove_cart_item'),
     path('checkout/', views.checkout_view, name='checkout'),
+    path('apply_coupon/', views.apply_coupon, name='apply_coupon'),
+    path('api/add_cart/<int:product_id>/', views.api_add_cart, name='api_add_cart'),
+    path('api/batch_add_cart/', views.api_batch_add_cart, name='api_batch_add_cart'),
+    path('api/remove_cart/<int:product_id>/<int:cart_item_id>/', views.api_remove_cart, name='api_remove_cart'),
+    path('api/remove_cart_item/<int:product_id>/<int:cart_item_id>/', views.api_remove_cart_item, name='api_remove_cart_item'),
 ]
\ No newline at end of file
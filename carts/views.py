@@ -1,141 +1,519 @@
 from django.shortcuts import render, redirect, get_object_or_404
-from django.http import HttpRequest, HttpResponse, HttpResponseRedirect
+from django.http import HttpRequest, HttpResponse, HttpResponseRedirect, JsonResponse
 from django.core.exceptions import ObjectDoesNotExist
+from django.contrib import messages
 from django.contrib.auth.decorators import login_required
+from django.views.decorators.http import require_POST
+from django.db import transaction
+from django.db.models import Q
 from decimal import Decimal
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+from uuid import uuid4
+import hashlib
+import json
 from store.models import Product, Variations
+from promotions.engine import CENT, find_coupon, price_cart
+from .backends import get_cart_store
 from .models import Cart, CartItem
 
 
 TAX_PERCATNAGE: int = 2
 
 
-def _cart_id(request: HttpRequest) -> str:
+def _cart_id(request: HttpRequest, create: bool = False) -> Optional[str]:
     """
-    Helper function to get the cart id from the session key, creating a new one if necessary
+    Helper function to get the cart id from the session key
+
+    Sessions are only created when a cart is about to be stored, so visitors who only
+    browse never get a session row.
 
     Args:
         request: An instance of `HttpRequest`.
+        create: Whether to create the session if the visitor has none yet.
 
     Returns:
-        A string representing the cart id.
+        A string representing the cart id, or None if the visitor has no session and `create` is False.
     """
     cart = request.session.session_key
 
-    if not cart:
-        cart = request.session.create()
+    if not cart and create:
+        request.session.create()
+        cart = request.session.session_key
 
     return cart
 
 
-def add_cart(request: HttpRequest, product_id: int) -> HttpResponseRedirect:
+def _get_product_variations(product: Product, data) -> List[Variations]:
     """
-    Adds a product to the cart or increases its quantity if it already exists in the cart
+    Resolve the variations selected in a request body with a single query
+
+    Args:
+        product: The product the variations belong to.
+        data: A mapping of variation category to value, e.g. `request.POST`.
+
+    Returns:
+        A list of matching `Variations` objects.
+    """
+    query = Q()
+    for key, value in data.items():
+        if key == 'csrfmiddlewaretoken':
+            continue
+        query |= Q(category__iexact=key, value__iexact=value)
+
+    if not query:
+        return []
+
+    return list(Variations.objects.filter(query, product=product))
+
+
+def _variation_signature(variations) -> FrozenSet[int]:
+    """
+    Build a hashable key identifying a set of variations regardless of their order
+
+    Args:
+        variations: An iterable of `Variations` objects.
+
+    Returns:
+        A frozenset of variation ids.
+    """
+    return frozenset(variation.id for variation in variations)
+
+
+def _cart_owner(request: HttpRequest, create: bool = False) -> Dict[str, Any]:
+    """
+    Get the lookup kwargs that select the cart items of the current visitor
 
     Args:
         request: An instance of `HttpRequest`.
-        product_id: An integer representing the id of the product to add to the cart.
+        create: Whether to create the guest cart if it does not exist yet.
 
     Returns:
-        An instance of `HttpResponseRedirect` that redirects to the cart page.
+        A dict with either a `user` or a `cart` key.
+
+    Raises:
+        Cart.DoesNotExist: If the visitor is a guest without a cart and `create` is False.
     """
-    current_user = request.user
-    product = Product.objects.get(id=product_id)
-    product_variation = []
+    if request.user.is_authenticated:
+        return {'user': request.user}
 
-    if request.method == 'POST':
-        for item in request.POST:
-            key = item
-            value = request.POST.get(key)
-
-            try:
-                variation = Variations.objects.get(product=product, category__iexact=key, value__iexact=value)
-                product_variation.append(variation)
-            except:
-                pass
-
-    # If user is authenticated
-    if current_user.is_authenticated:
-        is_cart_item_exists = CartItem.objects.filter(product=product, user=current_user).exists()
-
-        if is_cart_item_exists:
-            cart_item = CartItem.objects.filter(product=product, user=current_user)
-
-            ex_var_list = []
-            id_list = []
-            for item in cart_item:
-                existing_variation = item.variation.all()
-                ex_var_list.append(list(existing_variation))
-                id_list.append(item.id)
-
-            if product_variation in ex_var_list:
-                # Increase the cart item quantity
-                item_index = ex_var_list.index(product_variation)
-                item_id = id_list[item_index]
-                item = CartItem.objects.get(product=product, id=item_id)
-                item.quantity += 1
-                item.save()
-            else:
-                item = CartItem.objects.create(product=product, quantity=1, user=current_user)
+    if create:
+        cart, _ = Cart.objects.get_or_create(cart_id=_cart_id(request, create=True))
+    else:
+        cart_id = _cart_id(request)
+        if cart_id is None:
+            raise Cart.DoesNotExist
+        cart = Cart.objects.get(cart_id=cart_id)
+
+    return {'cart': cart}
+
+
+def _owner_key(owner: Dict[str, Any]) -> str:
+    """
+    Build the key identifying a cart owner in the cart store
+
+    Args:
+        owner: The lookup kwargs returned by `_cart_owner`.
+
+    Returns:
+        A string such as `user:1` or `cart:42`.
+    """
+    if 'user' in owner:
+        return f"user:{owner['user'].id}"
+
+    return f"cart:{owner['cart'].id}"
+
+
+def _add_to_cart(request: HttpRequest, product: Product, product_variation: List[Variations]) -> CartItem:
+    """
+    Add a product to the visitor's cart or increase the quantity of the matching cart item
+
+    Args:
+        request: An instance of `HttpRequest`.
+        product: The product to add.
+        product_variation: The variations selected for the product.
+
+    Returns:
+        The created or updated `CartItem`.
+    """
+    owner = _cart_owner(request, create=True)
+    owner_key = _owner_key(owner)
+    signature = _variation_signature(product_variation)
+    store = get_cart_store()
+
+    cart_items = CartItem.objects.filter(product=product, **owner).prefetch_related('variation')
+
+    for item in cart_items:
+        if _variation_signature(item.variation.all()) == signature:
+            # Increase the cart item quantity
+            store.adjust(owner_key, item, 1)
+            request.cart.invalidate()
+            return item
+
+    item = CartItem.objects.create(product=product, quantity=1, **owner)
+
+    if len(product_variation) > 0:
+        item.variation.add(*product_variation)
+
+    store.created(owner_key, item)
+    request.cart.invalidate()
+    return item
+
+
+def _resolve_cart_entries(entries) -> List[Tuple[Product, List[Variations], int]]:
+    """
+    Validate a batch of cart entries with one product query and one variations query
+
+    Args:
+        entries: An iterable of `(product_id, variation_ids, quantity)` tuples.
+
+    Returns:
+        A list of `(product, variations, quantity)` tuples.
+
+    Raises:
+        ValueError: If a product is unavailable, a variation does not belong to its product
+            or a quantity is not a positive integer.
+    """
+    entries = [(int(product_id), [int(v) for v in variation_ids], int(quantity))
+               for product_id, variation_ids, quantity in entries]
 
-                if len(product_variation) > 0:
-                    item.variation.clear()
-                    item.variation.add(*product_variation)
+    products = Product.objects.filter(is_available=True).in_bulk({product_id for product_id, _, _ in entries})
+    variations = Variations.objects.filter(is_active=True).in_bulk(
+        {variation_id for _, variation_ids, _ in entries for variation_id in variation_ids}
+    )
 
-                item.save()
+    resolved = []
+    for product_id, variation_ids, quantity in entries:
+        product = products.get(product_id)
+
+        if product is None:
+            raise ValueError(f'Product {product_id} is not available.')
+
+        if quantity < 1:
+            raise ValueError(f'Quantity of product {product_id} must be positive.')
+
+        product_variation = []
+        for variation_id in variation_ids:
+            variation = variations.get(variation_id)
+
+            if variation is None or variation.product_id != product.id:
+                raise ValueError(f'Variation {variation_id} is not available for product {product_id}.')
+
+            product_variation.append(variation)
+
+        resolved.append((product, product_variation, quantity))
+
+    return resolved
+
+
+def _add_items_to_cart(request: HttpRequest, entries: List[Tuple[Product, List[Variations], int]]) -> List[CartItem]:
+    """
+    Upsert many cart lines in one transaction
+
+    Entries matching an existing cart item by product and variations increase its quantity,
+    the rest are inserted together with their variation rows.
+
+    Args:
+        request: An instance of `HttpRequest`.
+        entries: A list of `(product, variations, quantity)` tuples, see `_resolve_cart_entries`.
+
+    Returns:
+        The list of updated and created `CartItem` objects.
+    """
+    # Merge duplicate entries of the batch first
+    merged: Dict[Tuple[int, FrozenSet[int]], List] = {}
+    for product, product_variation, quantity in entries:
+        key = (product.id, _variation_signature(product_variation))
+
+        if key in merged:
+            merged[key][2] += quantity
         else:
-            cart_item = CartItem.objects.create(product = product, quantity = 1, user=current_user)
+            merged[key] = [product, product_variation, quantity]
+
+    owner = _cart_owner(request, create=True)
+    store = get_cart_store()
+    store.flush([_owner_key(owner)])
+
+    with transaction.atomic():
+        existing_items = {
+            (item.product_id, _variation_signature(item.variation.all())): item
+            for item in CartItem.objects.filter(product_id__in={key[0] for key in merged}, **owner)
+                                        .select_for_update()
+                                        .prefetch_related('variation')
+        }
+
+        updated_items = []
+        new_items = []
+        new_variations = []
+        for key, (product, product_variation, quantity) in merged.items():
+            item = existing_items.get(key)
+
+            if item is not None:
+                item.quantity += quantity
+                updated_items.append(item)
+            else:
+                new_items.append(CartItem(product=product, quantity=quantity, **owner))
+                new_variations.append(product_variation)
 
-            if len(product_variation) > 0:
-                cart_item.variation.clear()
-                cart_item.variation.add(*product_variation)
+        CartItem.objects.bulk_update(updated_items, ['quantity'])
+        CartItem.objects.bulk_create(new_items)
 
-            cart_item.save()
-    # If user is not authenticated
-    else:
-        try:
-            cart = Cart.objects.get(cart_id=_cart_id(request))
-        except Cart.DoesNotExist:
-            cart = Cart.objects.create(
-                cart_id = _cart_id(request),
-            )
-        cart.save()
-
-        is_cart_item_exists = CartItem.objects.filter(product=product, cart=cart).exists()
-
-        if is_cart_item_exists:
-            cart_item = CartItem.objects.filter(product=product, cart=cart)
-
-            ex_var_list = []
-            id_list = []
-            for item in cart_item:
-                existing_variation = item.variation.all()
-                ex_var_list.append(list(existing_variation))
-                id_list.append(item.id)
-
-            if product_variation in ex_var_list:
-                # Increase the cart item quantity
-                item_index = ex_var_list.index(product_variation)
-                item_id = id_list[item_index]
-                item = CartItem.objects.get(product=product, id=item_id)
-                item.quantity += 1
-                item.save()
+        Through = CartItem.variation.through
+        Through.objects.bulk_create([
+            Through(cartitem_id=item.id, variations_id=variation.id)
+            for item, product_variation in zip(new_items, new_variations)
+            for variation in product_variation
+        ])
+
+    store.invalidate(_owner_key(owner))
+    request.cart.invalidate()
+    return updated_items + new_items
+
+
+def _merge_guest_cart(cart_id: Optional[str], user) -> None:
+    """
+    Move the items of a guest cart to a user, merging lines with the same product and variations
+
+    Args:
+        cart_id: The session key the guest cart was created with.
+        user: The `Account` the items are moved to.
+    """
+    if not cart_id:
+        return
+
+    cart = Cart.objects.filter(cart_id=cart_id).first()
+
+    if cart is None:
+        return
+
+    owner_keys = [_owner_key({'cart': cart}), _owner_key({'user': user})]
+    store = get_cart_store()
+    store.flush(owner_keys)
+
+    with transaction.atomic():
+        guest_items = list(CartItem.objects.filter(cart=cart, user__isnull=True)
+                                           .prefetch_related('variation'))
+
+        user_items = {
+            (item.product_id, _variation_signature(item.variation.all())): item
+            for item in CartItem.objects.filter(user=user, product_id__in={item.product_id for item in guest_items})
+                                        .select_for_update()
+                                        .prefetch_related('variation')
+        }
+
+        updated_items = {}
+        moved_ids = []
+        merged_ids = []
+        for item in guest_items:
+            key = (item.product_id, _variation_signature(item.variation.all()))
+            user_item = user_items.get(key)
+
+            if user_item is None:
+                user_items[key] = item
+                moved_ids.append(item.id)
             else:
-                item = CartItem.objects.create(product=product, quantity=1, cart=cart)
+                user_item.quantity += item.quantity
+                updated_items[user_item.id] = user_item
+                merged_ids.append(item.id)
 
-                if len(product_variation) > 0:
-                    item.variation.clear()
-                    item.variation.add(*product_variation)
+        CartItem.objects.bulk_update(updated_items.values(), ['quantity'])
+        CartItem.objects.filter(id__in=moved_ids).update(user=user, cart=None)
+        CartItem.objects.filter(id__in=merged_ids).delete()
+        cart.delete()
+
+    for owner_key in owner_keys:
+        store.invalidate(owner_key)
 
-                item.save()
-        else:
-            cart_item = CartItem.objects.create(product=product, quantity=1, cart=cart)
 
-            if len(product_variation) > 0:
-                cart_item.variation.clear()
-                cart_item.variation.add(*product_variation)
+def _decrease_cart_item(request: HttpRequest, product_id: int, cart_item_id: int) -> Optional[CartItem]:
+    """
+    Decrease the quantity of a cart item, deleting it when the quantity drops to zero
 
-            cart_item.save()
+    Args:
+        request: An instance of `HttpRequest`.
+        product_id: The id of the product of the cart item.
+        cart_item_id: The id of the cart item.
+
+    Returns:
+        The updated `CartItem`, or None if it was deleted.
+
+    Raises:
+        Cart.DoesNotExist: If the guest has no cart.
+        CartItem.DoesNotExist: If the cart item does not belong to the visitor.
+    """
+    owner = _cart_owner(request)
+    cart_item = CartItem.objects.get(product_id=product_id, id=cart_item_id, **owner)
+    request.cart.invalidate()
+
+    return get_cart_store().adjust(_owner_key(owner), cart_item, -1)
+
+
+def _delete_cart_item(request: HttpRequest, product_id: int, cart_item_id: int) -> None:
+    """
+    Delete a cart item of the current visitor
+
+    Args:
+        request: An instance of `HttpRequest`.
+        product_id: The id of the product of the cart item.
+        cart_item_id: The id of the cart item.
+
+    Raises:
+        Cart.DoesNotExist: If the guest has no cart.
+        CartItem.DoesNotExist: If the cart item does not belong to the visitor.
+    """
+    owner = _cart_owner(request)
+    cart_item = CartItem.objects.get(product_id=product_id, id=cart_item_id, **owner)
+    request.cart.invalidate()
+
+    get_cart_store().remove(_owner_key(owner), cart_item)
+
+
+def _get_cart_items(request: HttpRequest) -> List[CartItem]:
+    """
+    Get the active cart items of the current visitor with their products
+
+    The items are loaded once per request by `request.cart`, with the pending quantity
+    changes of the cart store applied.
+
+    Args:
+        request: An instance of `HttpRequest`.
+
+    Returns:
+        A list of active `CartItem` objects.
+
+    Raises:
+        Cart.DoesNotExist: If the guest has no cart.
+    """
+    if request.cart.owner is None:
+        raise Cart.DoesNotExist
+
+    return request.cart.items
+
+
+def _get_cart_totals(cart_items, coupon_code: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Calculate the totals of a list of cart items, applying the active promotions
+
+    Args:
+        cart_items: An iterable of `CartItem` objects with their products loaded.
+        coupon_code: The coupon code entered by the customer, if any.
+
+    Returns:
+        A dict with `total`, `quantity`, `discount`, `promotions`, `tax` and `grand_total` keys.
+    """
+    lines = [
+        (cart_item.id, cart_item.product_id, cart_item.product.category_id, cart_item.product.price, cart_item.quantity)
+        for cart_item in cart_items
+    ]
+    pricing = price_cart(lines, coupon_code)
+
+    total = pricing['total']
+    quantity = sum(line[4] for line in lines)
+    discount = pricing['discount']
+
+    tax = (Decimal(TAX_PERCATNAGE) / 100 * (total - discount)).quantize(CENT)
+    grand_total = total - discount + tax
+
+    return {
+        'total': total,
+        'quantity': quantity,
+        'discount': discount,
+        'promotions': pricing['promotions'],
+        'tax': tax,
+        'grand_total': grand_total,
+    }
+
+
+def _checkout_token(request: HttpRequest, cart_items) -> str:
+    """
+    Get the idempotency token of the checkout of the current cart contents
+
+    The token is kept in the session per cart contents, so rendering the checkout again for
+    the same cart gives the same token and `place_order` reuses the same unpaid order.
+
+    Args:
+        request: An instance of `HttpRequest`.
+        cart_items: An iterable of `CartItem` objects.
+
+    Returns:
+        A hex string token.
+    """
+    signature = hashlib.sha1(repr((
+        sorted((cart_item.id, cart_item.quantity) for cart_item in cart_items),
+        request.session.get('coupon_code', ''),
+    )).encode()).hexdigest()
+
+    tokens = request.session.get('checkout_tokens', {})
+
+    if signature not in tokens:
+        tokens = {signature: uuid4().hex}
+        request.session['checkout_tokens'] = tokens
+
+    return tokens[signature]
+
+
+def _cart_json_response(request: HttpRequest, cart_item: Optional[CartItem] = None, cart_item_id: Optional[int] = None) -> JsonResponse:
+    """
+    Build the JSON payload returned by the cart mutation API
+
+    Args:
+        request: An instance of `HttpRequest`.
+        cart_item: The mutated cart item, or None if it was deleted.
+        cart_item_id: The id of the mutated cart item.
+
+    Returns:
+        A `JsonResponse` with the updated line, the cart totals and the badge count.
+    """
+    try:
+        cart_items = _get_cart_items(request)
+    except Cart.DoesNotExist:
+        cart_items = []
+
+    totals = _get_cart_totals(cart_items, request.session.get('coupon_code'))
+    line = None
+
+    if cart_item is not None:
+        cart_item_id = cart_item.id
+
+    for item in cart_items:
+        if item.id == cart_item_id:
+            line = {
+                'id': item.id,
+                'quantity': item.quantity,
+                'sub_total': '%.2f'%item.sub_total(),
+            }
+            break
+
+    data = {
+        'cart_item_id': cart_item_id,
+        'item': line,
+        'total': '%.2f'%totals['total'],
+        'quantity': totals['quantity'],
+        'discount': '%.2f'%totals['discount'],
+        'tax': '%.2f'%totals['tax'],
+        'grand_total': '%.2f'%totals['grand_total'],
+        'cart_count': totals['quantity'],
+    }
+    return JsonResponse(data)
+
+
+def add_cart(request: HttpRequest, product_id: int) -> HttpResponseRedirect:
+    """
+    Adds a product to the cart or increases its quantity if it already exists in the cart
+
+    Args:
+        request: An instance of `HttpRequest`.
+        product_id: An integer representing the id of the product to add to the cart.
+
+    Returns:
+        An instance of `HttpResponseRedirect` that redirects to the cart page.
+    """
+    product = Product.objects.get(id=product_id)
+    product_variation = []
+
+    if request.method == 'POST':
+        product_variation = _get_product_variations(product, request.POST)
+
+    _add_to_cart(request, product, product_variation)
 
     return redirect('cart')
 
@@ -152,21 +530,11 @@ def remove_cart(request: HttpRequest, product_id: int, cart_item_id: int) -> Htt
     Returns:
         An instance of `HttpResponseRedirect` that redirects to the cart page.
     """
-    product = get_object_or_404(Product, id=product_id)
+    get_object_or_404(Product, id=product_id)
 
     try:
-        if request.user.is_authenticated:
-            cart_item: CartItem = CartItem.objects.get(product=product, user=request.user, id=cart_item_id)
-        else:
-            cart = Cart.objects.get(cart_id=_cart_id(request))
-            cart_item: CartItem = CartItem.objects.get(product=product, cart=cart, id=cart_item_id)
-
-        if cart_item.quantity > 1:
-            cart_item.quantity -= 1
-            cart_item.save()
-        else:
-            cart_item.delete()
-    except:
+        _decrease_cart_item(request, product_id, cart_item_id)
+    except (Cart.DoesNotExist, CartItem.DoesNotExist):
         pass
 
     return redirect('cart')
@@ -184,17 +552,99 @@ def remove_cart_item(request: HttpRequest, product_id: int, cart_item_id: int) -
     Returns:
         An instance of `HttpResponseRedirect` that redirects to the cart page.
     """
+    get_object_or_404(Product, id=product_id)
+    _delete_cart_item(request, product_id, cart_item_id)
+
+    return redirect('cart')
+
+
+@require_POST
+def api_add_cart(request: HttpRequest, product_id: int) -> JsonResponse:
+    """
+    JSON version of `add_cart` used by the cart page
+
+    Args:
+        request (HttpRequest): The HTTP request object.
+        product_id (int): The ID of the product to add.
+
+    Returns:
+        JsonResponse: The updated cart line, totals and badge count.
+    """
     product = get_object_or_404(Product, id=product_id)
+    product_variation = _get_product_variations(product, request.POST)
+    cart_item = _add_to_cart(request, product, product_variation)
 
-    if request.user.is_authenticated:
-        cart_item: CartItem = CartItem.objects.get(product=product, user=request.user, id=cart_item_id)
-    else:
-        cart = Cart.objects.get(cart_id=_cart_id(request))
-        cart_item: CartItem = CartItem.objects.get(product=product, cart=cart, id=cart_item_id)
+    return _cart_json_response(request, cart_item)
 
-    cart_item.delete()
 
-    return redirect('cart')
+@require_POST
+def api_batch_add_cart(request: HttpRequest) -> JsonResponse:
+    """
+    Add many products to the cart at once
+
+    The request body is JSON of the form
+    `{"items": [{"product_id": 1, "variations": [2, 3], "quantity": 1}, ...]}`.
+
+    Args:
+        request (HttpRequest): The HTTP request object.
+
+    Returns:
+        JsonResponse: The cart totals and badge count, or an error with status 400.
+    """
+    try:
+        body = json.loads(request.body)
+        entries = _resolve_cart_entries(
+            (item['product_id'], item.get('variations', []), item.get('quantity', 1))
+            for item in body['items']
+        )
+    except (ValueError, TypeError, KeyError) as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    _add_items_to_cart(request, entries)
+
+    return _cart_json_response(request)
+
+
+@require_POST
+def api_remove_cart(request: HttpRequest, product_id: int, cart_item_id: int) -> JsonResponse:
+    """
+    JSON version of `remove_cart` used by the cart page
+
+    Args:
+        request (HttpRequest): The HTTP request object.
+        product_id (int): The ID of the product to decrease.
+        cart_item_id (int): The ID of the cart item to decrease.
+
+    Returns:
+        JsonResponse: The updated cart line, totals and badge count.
+    """
+    try:
+        cart_item = _decrease_cart_item(request, product_id, cart_item_id)
+    except (Cart.DoesNotExist, CartItem.DoesNotExist):
+        return JsonResponse({'error': 'Cart item not found.'}, status=404)
+
+    return _cart_json_response(request, cart_item, cart_item_id)
+
+
+@require_POST
+def api_remove_cart_item(request: HttpRequest, product_id: int, cart_item_id: int) -> JsonResponse:
+    """
+    JSON version of `remove_cart_item` used by the cart page
+
+    Args:
+        request (HttpRequest): The HTTP request object.
+        product_id (int): The ID of the product to remove.
+        cart_item_id (int): The ID of the cart item to remove.
+
+    Returns:
+        JsonResponse: The cart totals and badge count.
+    """
+    try:
+        _delete_cart_item(request, product_id, cart_item_id)
+    except (Cart.DoesNotExist, CartItem.DoesNotExist):
+        return JsonResponse({'error': 'Cart item not found.'}, status=404)
+
+    return _cart_json_response(request, None, cart_item_id)
 
 
 def cart_view(request: HttpRequest, total: int = 0, quantity: int = 0) -> HttpResponse:
@@ -210,31 +660,48 @@ def cart_view(request: HttpRequest, total: int = 0, quantity: int = 0) -> HttpRe
         HttpResponse: The rendered cart page.
     """
     try:
-        if request.user.is_authenticated:
-            cart_items = CartItem.objects.filter(user=request.user, is_active=True)
-        else:
-            cart = Cart.objects.get(cart_id=_cart_id(request))
-            cart_items = CartItem.objects.filter(cart=cart, is_active=True)
-
-        for cart_item in cart_items:
-            total += cart_item.product.price * cart_item.quantity
-            quantity += cart_item.quantity
-
-        tax = Decimal(TAX_PERCATNAGE) / 100 * total
-        grand_total = total + tax
+        cart_items = _get_cart_items(request)
+        totals = _get_cart_totals(cart_items, request.session.get('coupon_code'))
     except ObjectDoesNotExist:
         return render(request, 'store/cart.html')
 
     context = {
-        'total': total,
-        'quantity': quantity,
+        'total': totals['total'],
+        'quantity': totals['quantity'],
+        'discount': totals['discount'],
+        'promotions': totals['promotions'],
+        'coupon_code': request.session.get('coupon_code', ''),
         'cart_items': cart_items,
-        'tax': '%.2f'%tax,
-        'grand_total': '%.2f'%grand_total,
+        'tax': '%.2f'%totals['tax'],
+        'grand_total': '%.2f'%totals['grand_total'],
     }
     return render(request, 'store/cart.html', context)
 
 
+@require_POST
+def apply_coupon(request: HttpRequest) -> HttpResponseRedirect:
+    """
+    Store the coupon code entered on the cart page in the session, or remove it if empty
+
+    Args:
+        request (HttpRequest): The HTTP request object.
+
+    Returns:
+        An instance of `HttpResponseRedirect` that redirects to the cart page.
+    """
+    code = request.POST.get('coupon', '').strip()
+
+    if not code:
+        request.session.pop('coupon_code', None)
+    elif find_coupon(code) is None:
+        messages.error(request, 'This coupon is not valid.')
+    else:
+        request.session['coupon_code'] = code
+        messages.success(request, 'Coupon applied.')
+
+    return redirect('cart')
+
+
 @login_required(login_url='login')
 def checkout_view(request: HttpRequest, total: int = 0, quantity: int = 0) -> HttpResponse:
     """This function renders the checkout page and displays the total price, quantity, and the items in the cart.
@@ -253,26 +720,20 @@ def checkout_view(request: HttpRequest, total: int = 0, quantity: int = 0) -> Ht
         then it raises the ObjectDoesNotExist exception.
     """
     try:
-        if request.user.is_authenticated:
-            cart_items = CartItem.objects.filter(user=request.user, is_active=True)
-        else:
-            cart = Cart.objects.get(cart_id=_cart_id(request))
-            cart_items = CartItem.objects.filter(cart=cart, is_active=True)
-
-        for cart_item in cart_items:
-            total += cart_item.product.price * cart_item.quantity
-            quantity += cart_item.quantity
-
-        tax = Decimal(TAX_PERCATNAGE) / 100 * total
-        grand_total = total + tax
+        cart_items = _get_cart_items(request)
+        totals = _get_cart_totals(cart_items, request.session.get('coupon_code'))
     except ObjectDoesNotExist:
         return render(request, 'store/cart.html')
 
     context = {
-        'total': total,
-        'quantity': quantity,
+        'total': totals['total'],
+        'quantity': totals['quantity'],
+        'discount': totals['discount'],
+        'promotions': totals['promotions'],
+        'coupon_code': request.session.get('coupon_code', ''),
         'cart_items': cart_items,
-        'tax': '%.2f'%tax,
-        'grand_total': '%.2f'%grand_total,
+        'tax': '%.2f'%totals['tax'],
+        'grand_total': '%.2f'%totals['grand_total'],
+        'idempotency_key': _checkout_token(request, cart_items),
     }
     return render(request, 'store/checkout.html', context)
@@ -0,0 +1,18 @@
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+
+def is_shared(alias: str) -> bool:
+    """Return whether a cache is shared between processes.
+
+    In-memory and dummy caches are private to a process, so state kept in them is not
+    seen, nor invalidated, by the other web and worker processes.
+
+    Args:
+        alias (str): The alias of the cache in `CACHES`.
+
+    Returns:
+        bool: False for the local memory and dummy backends, True otherwise.
+    """
+    return not isinstance(caches[alias], (LocMemCache, DummyCache))
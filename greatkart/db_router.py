@@ -0,0 +1,95 @@
+import random
+import time
+from contextvars import ContextVar
+from typing import Callable, Optional
+from django.conf import settings
+from django.http import HttpRequest, HttpResponse
+
+
+PRIMARY = 'default'
+STICKY_COOKIE = 'db_primary_until'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# Routing state of the current request, None outside of requests
+_routing: ContextVar[Optional[dict]] = ContextVar('db_routing', default=None)
+
+
+class ReplicaRouter:
+    """Send reads of the catalog and report models to a read replica, everything else to the primary.
+
+    Replicas are only used while `ReplicaRoutingMiddleware` allows it for the current
+    request: reads outside of requests, such as tasks and commands, and reads after a
+    write in the same request go to the primary. The apps read from replicas are set by
+    `DATABASE_REPLICA_APPS`.
+    """
+
+    def db_for_read(self, model, **hints) -> Optional[str]:
+        state = _routing.get()
+
+        if state is None or state['replica'] is None:
+            return None
+
+        if model._meta.app_label not in settings.DATABASE_REPLICA_APPS:
+            return None
+
+        return state['replica']
+
+    def db_for_write(self, model, **hints) -> str:
+        state = _routing.get()
+
+        # Read the rest of the request, and the next requests of the client, from the primary
+        if state is not None:
+            state['replica'] = None
+            state['wrote'] = True
+
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints) -> bool:
+        # Replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db: str, app_label: str, model_name: Optional[str] = None, **hints) -> Optional[bool]:
+        return None
+
+
+class ReplicaRoutingMiddleware:
+    """Decide per request whether the router may read from a replica.
+
+    Only safe requests read from replicas. A request that writes sets a cookie keeping
+    the client on the primary for `DATABASE_STICKY_SECONDS`, so it reads its own writes
+    while the replicas catch up.
+    """
+
+    def __init__(self, get_response: Callable) -> None:
+        self.get_response = get_response
+
+    def _replica(self, request: HttpRequest) -> Optional[str]:
+        """Pick the replica a request reads from, or None if it must use the primary."""
+        if not settings.DATABASE_REPLICAS or request.method not in SAFE_METHODS:
+            return None
+
+        try:
+            primary_until = float(request.COOKIES.get(STICKY_COOKIE, 0))
+        except ValueError:
+            primary_until = 0
+
+        if primary_until > time.time():
+            return None
+
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        state = {'replica': self._replica(request), 'wrote': False}
+        token = _routing.set(state)
+
+        try:
+            response = self.get_response(request)
+        finally:
+            _routing.reset(token)
+
+        sticky_seconds = settings.DATABASE_STICKY_SECONDS
+        if state['wrote'] and settings.DATABASE_REPLICAS and sticky_seconds:
+            response.set_cookie(STICKY_COOKIE, str(int(time.time()) + sticky_seconds),
+                                max_age=sticky_seconds, httponly=True, samesite='Lax')
+
+        return response
@@ -0,0 +1,144 @@
+import logging
+import math
+import time
+from typing import Callable, Dict, Iterable, Optional, Tuple
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY
+from django.core.cache import caches
+from django.http import HttpRequest, HttpResponse
+from .cache import is_shared
+
+
+logger = logging.getLogger(__name__)
+
+PERIODS: Dict[str, int] = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate: str) -> Tuple[int, int]:
+    """Parse a rate such as `10/m` into a number of requests and a period in seconds.
+
+    Args:
+        rate (str): The rate, as `<requests>/<s|m|h|d>`, optionally with a multiplier like `100/5m`.
+
+    Returns:
+        Tuple[int, int]: The allowed number of requests and the period in seconds.
+    """
+    count, period = rate.split('/')
+    multiplier = int(period[:-1]) if period[:-1] else 1
+    return int(count), multiplier * PERIODS[period[-1]]
+
+
+def client_ip(request: HttpRequest) -> str:
+    """Return the IP address of the client.
+
+    Behind a proxy that appends the connecting address to `X-Forwarded-For`, such as the
+    Heroku router, set `RATELIMIT_TRUST_FORWARDED_FOR` so the last address is used.
+    """
+    if getattr(settings, 'RATELIMIT_TRUST_FORWARDED_FOR', False):
+        forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR', '')
+        if forwarded_for:
+            return forwarded_for.split(',')[-1].strip()
+
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def _identities(request: HttpRequest) -> Iterable[str]:
+    """Yield the keys a request is limited by: its IP and, when known, its account.
+
+    The account is read from the session or the submitted login email without loading
+    the user from the database.
+    """
+    yield f'ip:{client_ip(request)}'
+
+    user_id = request.session.get(SESSION_KEY) if hasattr(request, 'session') else None
+    if user_id is not None:
+        yield f'user:{user_id}'
+    elif request.method == 'POST' and request.POST.get('email'):
+        yield f'email:{request.POST["email"].strip().lower()}'
+
+
+def _cache_alias() -> str:
+    return getattr(settings, 'RATELIMIT_CACHE', 'default')
+
+
+def is_limited(request: HttpRequest, name: str, rate: str) -> Optional[int]:
+    """Count a request against the limits of its IP and account.
+
+    Uses a sliding window counter: the count of the current fixed window plus the count
+    of the previous one weighted by how much of it still overlaps the sliding window. Each
+    check is one `incr` and one `get` per identity in the cache set by `RATELIMIT_CACHE`.
+
+    Args:
+        request (HttpRequest): The request.
+        name (str): The name of the limit, usually the URL name of the view.
+        rate (str): The allowed rate, see `parse_rate`.
+
+    Returns:
+        Optional[int]: Seconds to wait before retrying if the request is over the limit, otherwise None.
+    """
+    cache = caches[_cache_alias()]
+    limit, period = parse_rate(rate)
+    now = time.time()
+    window = int(now // period)
+    elapsed = now - window * period
+
+    for identity in _identities(request):
+        key = f'ratelimit:{name}:{identity}:{window}'
+        cache.add(key, 0, period * 2)
+        try:
+            current = cache.incr(key)
+        except ValueError:
+            # The key expired between add and incr
+            current = 1
+            cache.set(key, current, period * 2)
+        previous = cache.get(f'ratelimit:{name}:{identity}:{window - 1}', 0)
+
+        if previous * (period - elapsed) / period + current > limit:
+            return max(math.ceil(period - elapsed), 1)
+
+    return None
+
+
+def too_many_requests(retry_after: int) -> HttpResponse:
+    """Build a 429 response."""
+    response = HttpResponse('Too many requests, please try again later.', status=429)
+    response['Retry-After'] = str(retry_after)
+    return response
+
+
+class RateLimitMiddleware:
+    """Rate limit views by URL name, as configured by the `RATE_LIMITS` setting.
+
+    `RATE_LIMITS` maps URL names to a rate, e.g. `'10/m'`, or to a dict with `rate` and
+    `methods` keys. Limited requests get a 429 response before the view runs.
+
+    With a cache private to the process the limits are counted per process, so a warning
+    is logged at startup: the allowed rate is multiplied by the number of processes.
+    """
+
+    def __init__(self, get_response: Callable) -> None:
+        self.get_response = get_response
+        self.limits = {}
+
+        for url_name, config in getattr(settings, 'RATE_LIMITS', {}).items():
+            if isinstance(config, str):
+                config = {'rate': config}
+            methods = {method.upper() for method in config.get('methods', ('GET', 'POST'))}
+            self.limits[url_name] = (config['rate'], methods)
+
+        if self.limits and not is_shared(_cache_alias()):
+            logger.warning('Rate limits are counted per process, the "%s" cache is not shared between processes.',
+                           _cache_alias())
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        return self.get_response(request)
+
+    def process_view(self, request: HttpRequest, view_func: Callable, view_args, view_kwargs) -> Optional[HttpResponse]:
+        url_name = request.resolver_match.url_name if request.resolver_match else None
+        limit = self.limits.get(url_name)
+
+        if limit is None or request.method not in limit[1]:
+            return None
+
+        retry_after = is_limited(request, url_name, limit[0])
+        return too_many_requests(retry_after) if retry_after is not None else None
@@ -53,15 +53,22 @@ INSTALLED_APPS = [
     'store',
     'carts',
     'orders',
+    'promotions',
+    'tasks',
+    'mailer',
+    'reports',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'greatkart.db_router.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
+    'greatkart.ratelimit.RateLimitMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'carts.middleware.CartMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -90,6 +97,10 @@ WSGI_APPLICATION = 'greatkart.wsgi.application'
 
 AUTH_USER_MODEL = 'accounts.Account'
 
+# Users log in with their email address, compared without case. With a shared cache the
+# user of each request is read from the USER_CACHE cache (the default cache unless set)
+AUTHENTICATION_BACKENDS = ['accounts.backends.EmailBackend']
+
 
 # Database
 # https://docs.djangoproject.com/en/4.1/ref/settings/#databases
@@ -115,6 +126,109 @@ db = dj_database_url.config()
 DATABASES['default'].update(db)
 
 
+# Read replicas
+# DATABASE_REPLICA_URLS holds comma separated URLs of read replicas of the default
+# database, added as `replica1`, `replica2`, ... Safe requests read the models of the
+# DATABASE_REPLICA_APPS apps from a replica. A client that wrote stays on the primary
+# for DATABASE_STICKY_SECONDS. Locally, point DATABASE_URL and DATABASE_REPLICA_URLS
+# at two SQLite files and migrate both with `migrate --database`.
+
+DATABASE_REPLICAS = []
+for url in filter(None, os.environ.get('DATABASE_REPLICA_URLS', '').split(',')):
+    alias = f'replica{len(DATABASE_REPLICAS) + 1}'
+    DATABASES[alias] = dict(dj_database_url.parse(url.strip()), TEST={'MIRROR': 'default'})
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['greatkart.db_router.ReplicaRouter']
+DATABASE_REPLICA_APPS = ['store', 'category', 'reports']
+DATABASE_STICKY_SECONDS = int(os.environ.get('DATABASE_STICKY_SECONDS', 10))
+
+
+# Cache
+# Set REDIS_URL to share the cache between the processes of all dynos. Without it each
+# process has its own in-memory cache, and the features that keep state in the cache
+# (cached sessions, the user cache, the cached cart store) are disabled, see
+# `greatkart.cache.is_shared`.
+
+REDIS_URL = os.environ.get('REDIS_URL', '')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+
+# Sessions
+# Sessions are only created once something is stored in them. With a shared cache they
+# are read from the SESSION_CACHE_ALIAS cache, falling back to the database on a miss,
+# and written to both. Without one they are stored in the database only, since a
+# per-process copy would serve stale data and outlive a logout.
+
+SESSION_CACHE_ALIAS = os.environ.get('SESSION_CACHE_ALIAS', 'default')
+SESSION_ENGINE = os.environ.get('SESSION_ENGINE', 'django.contrib.sessions.backends.cached_db' if REDIS_URL
+                                else 'django.contrib.sessions.backends.db')
+
+
+# Cart storage
+# 'carts.backends.DatabaseCartStore' writes every cart change to the database,
+# 'carts.backends.CachedCartStore' keeps quantity changes in the cache and writes
+# them in batches with `python manage.py flush_cart_store`. It needs a shared cache,
+# see REDIS_URL.
+
+CART_STORE = os.environ.get('CART_STORE', 'carts.backends.DatabaseCartStore')
+
+
+# Email
+# Emails are queued by `mailer.service.queue_email` and sent by the task worker.
+# Use 'django.core.mail.backends.console.EmailBackend' or
+# 'django.core.mail.backends.filebased.EmailBackend' with EMAIL_FILE_PATH locally.
+
+EMAIL_BACKEND = os.environ.get('EMAIL_BACKEND', 'django.core.mail.backends.smtp.EmailBackend')
+EMAIL_HOST = os.environ.get('EMAIL_HOST', 'localhost')
+EMAIL_PORT = int(os.environ.get('EMAIL_PORT', 25))
+EMAIL_HOST_USER = os.environ.get('EMAIL_HOST_USER', '')
+EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD', '')
+EMAIL_USE_TLS = os.environ.get('EMAIL_USE_TLS') == 'True'
+EMAIL_FILE_PATH = os.environ.get('EMAIL_FILE_PATH', BASE_DIR / 'sent_emails')
+DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL', 'GreatKart <noreply@greatkart.com>')
+
+
+# Payment webhooks
+# Providers sign events with HMAC-SHA256 over "<timestamp>.<body>" using this secret,
+# events older than the tolerance in seconds are rejected.
+
+PAYMENT_WEBHOOK_SECRET = os.environ.get('PAYMENT_WEBHOOK_SECRET', '')
+PAYMENT_WEBHOOK_TOLERANCE = int(os.environ.get('PAYMENT_WEBHOOK_TOLERANCE', 300))
+
+
+# Rate limiting
+# Requests to these URL names are limited per client IP and per account with a sliding
+# window held in the RATELIMIT_CACHE cache, which must be shared between processes
+# (e.g. Redis or Memcached) for the limits to hold across dynos. With the in-memory cache
+# used without REDIS_URL, each process counts its own requests, so a client may make the
+# configured rate once per process; a warning is logged at startup.
+
+RATELIMIT_CACHE = os.environ.get('RATELIMIT_CACHE', 'default')
+RATELIMIT_TRUST_FORWARDED_FOR = os.environ.get('RATELIMIT_TRUST_FORWARDED_FOR') == 'True'
+RATE_LIMITS = {
+    'login': {'rate': '10/m', 'methods': ['POST']},
+    'registration': {'rate': '5/m', 'methods': ['POST']},
+    'search': '30/m',
+    'add_cart': '60/m',
+    'api_add_cart': '60/m',
+    'api_batch_add_cart': '20/m',
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.1/ref/settings/#auth-password-validators
 
@@ -0,0 +1,45 @@
+from django.db import models
+
+
+class OutgoingEmail(models.Model):
+    """A rendered email waiting to be sent by `mailer.service.send_queued`.
+
+    Attributes:
+        subject (str): The subject of the email.
+        body (str): The plain text body of the email.
+        html_body (str): The HTML body of the email, if any.
+        from_email (str): The sender address.
+        to (list): The recipient addresses.
+        status (str): The delivery status of the email, selected from STATUS.
+        attempts (int): The number of delivery attempts.
+        last_error (str): The error of the last failed attempt.
+        created_at (datetime): The datetime the email was queued.
+        claimed_at (datetime): The datetime a sender last claimed the email for sending.
+        sent_at (datetime): The datetime the email was sent.
+    """
+    PENDING = 'pending'
+    SENDING = 'sending'
+    SENT = 'sent'
+    FAILED = 'failed'
+
+    STATUS = (
+        (PENDING, 'Pending'),
+        (SENDING, 'Sending'),
+        (SENT, 'Sent'),
+        (FAILED, 'Failed'),
+    )
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    html_body = models.TextField(blank=True)
+    from_email = models.CharField(max_length=255)
+    to = models.JSONField(default=list)
+    status = models.CharField(max_length=10, choices=STATUS, default=PENDING, db_index=True)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    claimed_at = models.DateTimeField(blank=True, null=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self) -> str:
+        return self.subject
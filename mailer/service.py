@@ -0,0 +1,149 @@
+from datetime import timedelta
+from typing import Any, Dict, List, Optional
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.db.models import F, Q
+from django.template import TemplateDoesNotExist
+from django.template.loader import render_to_string
+from django.utils import timezone
+from .models import OutgoingEmail
+
+
+BATCH_SIZE: int = 50
+MAX_ATTEMPTS: int = 3
+# Seconds after which an email still claimed for sending is assumed to be abandoned
+SENDING_TIMEOUT: int = 15 * 60
+
+
+def queue_email(template_name: str, subject: str, recipients: List[str], context: Optional[Dict[str, Any]] = None) -> OutgoingEmail:
+    """Render an email and queue it for the mailer worker.
+
+    The body is rendered from `<template_name>.txt` and, when it exists, `<template_name>.html`.
+    Nothing is sent on the request thread, a `send_queued_emails` task is enqueued once the
+    current transaction commits.
+
+    Args:
+        template_name (str): The template path without extension, e.g. `emails/order_received`.
+        subject (str): The subject of the email.
+        recipients (List[str]): The recipient addresses.
+        context (Dict[str, Any], optional): The template context.
+
+    Returns:
+        OutgoingEmail: The queued email.
+    """
+    context = context or {}
+
+    try:
+        html_body = render_to_string(f'{template_name}.html', context)
+    except TemplateDoesNotExist:
+        html_body = ''
+
+    email = OutgoingEmail.objects.create(
+        subject=subject,
+        body=render_to_string(f'{template_name}.txt', context),
+        html_body=html_body,
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=list(recipients),
+    )
+
+    transaction.on_commit(_schedule_sending)
+    return email
+
+
+def _schedule_sending() -> None:
+    """Enqueue a sending task unless one is already waiting."""
+    from tasks.models import Task
+    from .tasks import send_queued_emails
+
+    if not Task.objects.filter(name='mailer.tasks.send_queued_emails', status=Task.QUEUED).exists():
+        send_queued_emails.enqueue()
+
+
+def reclaim_stale(timeout: int = SENDING_TIMEOUT) -> int:
+    """Return emails left in sending by a crashed sender to the queue.
+
+    The interrupted delivery counts as an attempt, so an email that keeps crashing the
+    sender ends up failed after `MAX_ATTEMPTS`. It may have been delivered before the
+    crash, so a reclaimed email can arrive twice.
+
+    Args:
+        timeout (int, optional): Seconds after which a claimed email is considered abandoned.
+
+    Returns:
+        int: The number of reclaimed emails.
+    """
+    stale = (OutgoingEmail.objects.filter(status=OutgoingEmail.SENDING)
+                                  .filter(Q(claimed_at__lt=timezone.now() - timedelta(seconds=timeout)) | Q(claimed_at__isnull=True)))
+    error = 'The sender stopped while sending.'
+
+    with transaction.atomic():
+        failed = stale.filter(attempts__gte=MAX_ATTEMPTS - 1).update(status=OutgoingEmail.FAILED, attempts=F('attempts') + 1,
+                                                                      last_error=error)
+        retried = stale.update(status=OutgoingEmail.PENDING, attempts=F('attempts') + 1, last_error=error)
+
+    return failed + retried
+
+
+def send_queued(batch_size: int = BATCH_SIZE) -> int:
+    """Send pending emails in batches, reusing one connection for all of them.
+
+    Emails that fail are retried by a later run, up to `MAX_ATTEMPTS` times. Emails left
+    in sending by a crashed run are reclaimed first, see `reclaim_stale`.
+
+    Args:
+        batch_size (int, optional): Number of emails claimed per batch.
+
+    Returns:
+        int: The number of sent emails.
+
+    Raises:
+        RuntimeError: If some emails failed and should be retried, so the task queue backs off.
+    """
+    reclaim_stale()
+
+    sent_count = 0
+    retry_ids = []
+    connection = get_connection()
+    connection.open()
+
+    try:
+        while True:
+            with transaction.atomic():
+                emails = list(OutgoingEmail.objects.select_for_update(skip_locked=True)
+                                                   .filter(status=OutgoingEmail.PENDING)
+                                                   .exclude(id__in=retry_ids)
+                                                   .order_by('id')[:batch_size])
+                claimed = OutgoingEmail.objects.filter(id__in=[email.id for email in emails])
+                claimed.update(status=OutgoingEmail.SENDING, claimed_at=timezone.now())
+
+            if not emails:
+                break
+
+            sent_ids = []
+            for email in emails:
+                message = EmailMultiAlternatives(email.subject, email.body, email.from_email, email.to, connection=connection)
+                if email.html_body:
+                    message.attach_alternative(email.html_body, 'text/html')
+
+                try:
+                    message.send()
+                except Exception as e:
+                    attempts = email.attempts + 1
+                    status = OutgoingEmail.FAILED if attempts >= MAX_ATTEMPTS else OutgoingEmail.PENDING
+                    OutgoingEmail.objects.filter(id=email.id).update(status=status, attempts=attempts, last_error=str(e))
+
+                    if status == OutgoingEmail.PENDING:
+                        retry_ids.append(email.id)
+                else:
+                    sent_ids.append(email.id)
+
+            OutgoingEmail.objects.filter(id__in=sent_ids).update(status=OutgoingEmail.SENT, sent_at=timezone.now())
+            sent_count += len(sent_ids)
+    finally:
+        connection.close()
+
+    if retry_ids:
+        raise RuntimeError(f'{len(retry_ids)} emails failed and will be retried.')
+
+    return sent_count
@@ -0,0 +1,8 @@
+from tasks.queue import task
+from .service import send_queued
+
+
+@task
+def send_queued_emails() -> None:
+    """Send the queued emails in batches over a single connection."""
+    send_queued()
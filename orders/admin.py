@@ -1,5 +1,34 @@
-from django.contrib import admin
-from .models import Payment, Order, OrderProduct
+import re
+from django.contrib import admin, messages
+from django.db.models import Q
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from accounts.models import Account
+from .exports import EXPORT_FORMATS
+from .models import Payment, Order, OrderProduct, ArchivedOrder, PaymentEvent, OrderStatusChange
+from .status import ACCEPTED, CANCELLED, COMPLETED, transition_orders
+
+
+# Search terms that can only be an order number or a phone number
+NUMBER_PATTERN = re.compile(r'^\+?[\d\s-]{5,}$')
+
+
+class ExportActionsMixin:
+    """Admin actions streaming the selected live or archived orders as CSV or JSON Lines."""
+
+    def _export(self, queryset, export_format):
+        rows, content_type = EXPORT_FORMATS[export_format]
+        response = StreamingHttpResponse(rows([queryset]), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="orders-{timezone.now():%Y%m%d-%H%M%S}.{export_format}"'
+        return response
+
+    @admin.action(description='Export selected orders as CSV')
+    def export_csv(self, request, queryset):
+        return self._export(queryset, 'csv')
+
+    @admin.action(description='Export selected orders as JSON Lines')
+    def export_jsonl(self, request, queryset):
+        return self._export(queryset, 'jsonl')
 
 
 class OrderProductInline(admin.TabularInline):
@@ -29,13 +58,16 @@ class OrderProductAdmin(admin.ModelAdmin):
 
 
 @admin.register(Order)
-class OrderAdmin(admin.ModelAdmin):
+class OrderAdmin(ExportActionsMixin, admin.ModelAdmin):
     inlines = [OrderProductInline]
     list_display = ('order_number', 'full_name', 'email', 'phone', 'order_total', 'status', 'is_ordered', 'created_at')
     list_filter = ('status', 'created_at')
-    search_fields = ('order_number', 'user__email', 'user__username', 'first_name', 'last_name', 'email', 'phone', 'city', 'address')
-    readonly_fields = ('created_at', 'updated_at')
+    # Searched through `search_text`, see `get_search_results`
+    search_fields = ('search_text',)
+    # The status is changed with the transition actions
+    readonly_fields = ('status', 'created_at', 'updated_at')
     list_per_page = 20
+    actions = ['mark_accepted', 'mark_completed', 'mark_cancelled', 'export_csv', 'export_jsonl']
     fieldsets = (
         (None, {
             'fields': ('user', 'payment', 'order_number', 'status', 'ip', 'is_ordered')
@@ -55,6 +87,89 @@ class OrderAdmin(admin.ModelAdmin):
     def has_add_permission(self, request):
         # Disable adding new orders from the admin site
         return False
+
+    def get_search_results(self, request, queryset, search_term):
+        """Search orders without joins, trying indexed exact matches first.
+
+        Email addresses, order numbers and phone numbers are looked up on their indexed
+        columns. Other terms, or exact lookups without results, match every word against
+        `Order.search_text`, which has a trigram index on PostgreSQL.
+        """
+        term = search_term.strip()
+
+        if not term:
+            return queryset, False
+
+        if '@' in term:
+            emails = {term, term.lower()}
+            matches = queryset.filter(Q(email__in=emails) | Q(user__in=Account.objects.filter(email__in=emails)))
+            if matches.exists():
+                return matches, False
+        elif NUMBER_PATTERN.match(term):
+            matches = queryset.filter(Q(order_number=term) | Q(phone=term))
+            if matches.exists():
+                return matches, False
+
+        for word in term.lower().split():
+            queryset = queryset.filter(search_text__contains=word)
+
+        return queryset, False
+
+    def _transition(self, request, queryset, to_status):
+        moved, skipped = transition_orders(queryset, to_status, changed_by=request.user, note='Admin action')
+        self.message_user(request, f'{moved} orders moved to {to_status}.', messages.SUCCESS)
+        if skipped:
+            self.message_user(request, f'{skipped} orders skipped, they are unpaid or cannot move to {to_status}.', messages.WARNING)
+
+    @admin.action(description='Mark selected orders as accepted')
+    def mark_accepted(self, request, queryset):
+        self._transition(request, queryset, ACCEPTED)
+
+    @admin.action(description='Mark selected orders as completed')
+    def mark_completed(self, request, queryset):
+        self._transition(request, queryset, COMPLETED)
+
+    @admin.action(description='Mark selected orders as cancelled')
+    def mark_cancelled(self, request, queryset):
+        self._transition(request, queryset, CANCELLED)
+
+
+@admin.register(ArchivedOrder)
+class ArchivedOrderAdmin(ExportActionsMixin, admin.ModelAdmin):
+    list_display = ('order_number', 'full_name', 'email', 'order_total', 'status', 'created_at', 'archived_at')
+    list_filter = ('status',)
+    search_fields = ('order_number', 'email', 'phone')
+    list_per_page = 20
+    actions = ['export_csv', 'export_jsonl']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(OrderStatusChange)
+class OrderStatusChangeAdmin(admin.ModelAdmin):
+    list_display = ('order_number', 'from_status', 'to_status', 'changed_by', 'note', 'created_at')
+    list_filter = ('to_status',)
+    search_fields = ('order_number',)
+    list_per_page = 50
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(PaymentEvent)
+class PaymentEventAdmin(admin.ModelAdmin):
+    list_display = ('event_id', 'provider', 'event_type', 'status', 'received_at', 'processed_at')
+    list_filter = ('status', 'provider', 'event_type')
+    search_fields = ('event_id',)
+    readonly_fields = ('received_at', 'processed_at')
+    list_per_page = 50
     
 
 admin.site.register(Payment)
@@ -0,0 +1,127 @@
+from datetime import datetime
+from typing import List, Optional, Sequence, Union
+from django.db import transaction
+from django.http import Http404
+from .models import ArchivedOrder, ArchivedOrderProduct, Order, OrderProduct
+from .status import CANCELLED, COMPLETED
+
+
+ARCHIVABLE_STATUSES = (COMPLETED, CANCELLED)
+ARCHIVE_AFTER_DAYS: int = 365
+BATCH_SIZE: int = 500
+
+AnyOrder = Union[Order, ArchivedOrder]
+
+
+def _copy(instance, model):
+    """Build an instance of `model` with the concrete field values of `instance`, ID included."""
+    return model(**{field.attname: getattr(instance, field.attname) for field in instance._meta.concrete_fields})
+
+
+def archivable_order_ids(before: datetime, after_id: int = 0, batch_size: int = BATCH_SIZE) -> List[int]:
+    """Return the IDs of the next batch of orders that can be archived.
+
+    Args:
+        before (datetime): Only orders created before this datetime are archived.
+        after_id (int, optional): Continue after this order ID.
+        batch_size (int, optional): Maximum number of IDs to return.
+
+    Returns:
+        List[int]: The order IDs, in ascending order.
+    """
+    return list(Order.objects.filter(id__gt=after_id, is_ordered=True, status__in=ARCHIVABLE_STATUSES, created_at__lt=before)
+                             .order_by('id')
+                             .values_list('id', flat=True)[:batch_size])
+
+
+def archive_orders(order_ids: Sequence[int], before: datetime) -> int:
+    """Move orders with their lines and line variations to the archive tables.
+
+    Runs in one transaction. Rows keep their IDs, so links to archived orders keep working.
+    Orders that no longer match the archival criteria are skipped.
+
+    Args:
+        order_ids (Sequence[int]): The IDs of the orders to archive.
+        before (datetime): Only orders created before this datetime are archived.
+
+    Returns:
+        int: The number of archived orders.
+    """
+    with transaction.atomic():
+        orders = list(Order.objects.select_for_update()
+                                   .filter(id__in=order_ids, is_ordered=True, status__in=ARCHIVABLE_STATUSES, created_at__lt=before))
+        if not orders:
+            return 0
+
+        archived_ids = [order.id for order in orders]
+        lines = list(OrderProduct.objects.filter(order_id__in=archived_ids))
+
+        Through = OrderProduct.variation.through
+        variations = Through.objects.filter(orderproduct_id__in=[line.id for line in lines]).values_list('orderproduct_id', 'variations_id')
+
+        ArchivedOrder.objects.bulk_create([_copy(order, ArchivedOrder) for order in orders])
+        ArchivedOrderProduct.objects.bulk_create([_copy(line, ArchivedOrderProduct) for line in lines])
+
+        ArchivedThrough = ArchivedOrderProduct.variation.through
+        ArchivedThrough.objects.bulk_create([
+            ArchivedThrough(archivedorderproduct_id=line_id, variations_id=variation_id)
+            for line_id, variation_id in variations
+        ])
+
+        # Deleting the orders cascades to their lines and line variations
+        Order.objects.filter(id__in=archived_ids).delete()
+
+    return len(orders)
+
+
+def get_user_order(user, order_number: str) -> AnyOrder:
+    """Return an order of a user by its number, looking in the archive when it is not live.
+
+    Args:
+        user (Account): The user who placed the order.
+        order_number (str): The order number.
+
+    Returns:
+        AnyOrder: The live or archived order.
+
+    Raises:
+        Http404: If the user has no such order.
+    """
+    order = (Order.objects.filter(order_number=order_number, user=user).first()
+             or ArchivedOrder.objects.filter(order_number=order_number, user=user).first())
+
+    if order is None:
+        raise Http404('No order matches the given query.')
+
+    return order
+
+
+def user_order_history(user_id: int, fields: Sequence[str], limit: int, before: Optional[int] = None) -> List[AnyOrder]:
+    """Return the newest paid orders of a user from the live and archive tables.
+
+    Each table is read with one indexed query of at most `limit` rows, the results are
+    merged by ID.
+
+    Args:
+        user_id (int): The ID of the user.
+        fields (Sequence[str]): The fields to load.
+        limit (int): The maximum number of orders to return.
+        before (int, optional): Only return orders with a lower ID.
+
+    Returns:
+        List[AnyOrder]: The orders, newest first.
+    """
+    orders = []
+
+    for model in (Order, ArchivedOrder):
+        queryset = model.objects.filter(user_id=user_id, is_ordered=True)
+        if before is not None:
+            queryset = queryset.filter(id__lt=before)
+        orders += queryset.only(*fields).order_by('-id')[:limit]
+
+    return sorted(orders, key=lambda order: order.id, reverse=True)[:limit]
+
+
+def count_user_orders(user_id: int) -> int:
+    """Count the paid orders of a user in the live and archive tables."""
+    return sum(model.objects.filter(user_id=user_id, is_ordered=True).count() for model in (Order, ArchivedOrder))
@@ -0,0 +1,132 @@
+import csv
+import json
+from itertools import groupby
+from typing import Iterable, Iterator, List, Tuple
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import QuerySet
+from .archive import AnyOrder
+from .models import ArchivedOrder, ArchivedOrderProduct, Order, OrderProduct
+
+
+BATCH_SIZE: int = 500
+
+ORDER_COLUMNS = (
+    'order_number', 'created_at', 'status', 'is_ordered', 'account_email',
+    'first_name', 'last_name', 'email', 'phone', 'city', 'address',
+    'item_count', 'sub_total', 'discount', 'tax', 'order_total',
+    'payment_id', 'payment_method', 'amount_paid', 'payment_status', 'archived',
+)
+LINE_COLUMNS = ('product', 'variations', 'quantity', 'product_price')
+
+# Order line model of the live and the archived orders
+LINE_MODELS = {Order: OrderProduct, ArchivedOrder: ArchivedOrderProduct}
+
+
+class Echo:
+    """A file-like object returning what is written to it, so `csv.writer` can produce lines lazily."""
+
+    def write(self, value: str) -> str:
+        return value
+
+
+def iter_orders(querysets: Iterable[QuerySet], batch_size: int = BATCH_SIZE) -> Iterator[Tuple[AnyOrder, list]]:
+    """Yield the orders of querysets with their order lines, a batch at a time.
+
+    Each queryset selects live or archived orders, their lines are read from the matching
+    line table. Orders are read in id order with keyset pagination, and the lines of each
+    batch are streamed with `iterator`, so memory use does not depend on the number of orders.
+
+    Args:
+        querysets (Iterable[QuerySet]): The `Order` and `ArchivedOrder` querysets to export, in order.
+        batch_size (int, optional): Number of orders loaded at a time.
+
+    Yields:
+        Tuple[AnyOrder, list]: An order and its lines.
+    """
+    for queryset in querysets:
+        line_model = LINE_MODELS[queryset.model]
+        queryset = queryset.select_related('user', 'payment').order_by('id')
+        last_id = 0
+
+        while True:
+            orders = list(queryset.filter(id__gt=last_id)[:batch_size])
+            if not orders:
+                break
+
+            lines = (line_model.objects.filter(order_id__in=[order.id for order in orders])
+                                       .select_related('product')
+                                       .prefetch_related('variation')
+                                       .order_by('order_id', 'id')
+                                       .iterator(chunk_size=batch_size))
+            lines_by_order = {order_id: list(order_lines) for order_id, order_lines in groupby(lines, key=lambda line: line.order_id)}
+
+            for order in orders:
+                yield order, lines_by_order.get(order.id, [])
+
+            last_id = orders[-1].id
+
+
+def _order_values(order: AnyOrder) -> list:
+    payment = order.payment
+    return [
+        order.order_number, order.created_at.isoformat(), order.status, order.is_ordered,
+        order.user.email if order.user else '',
+        order.first_name, order.last_name, order.email, order.phone, order.city, order.address,
+        order.item_count, order.sub_total, order.discount, order.tax, order.order_total,
+        payment.payment_id if payment else '', payment.payment_method if payment else '',
+        payment.amount_paid if payment else '', payment.status if payment else '',
+        isinstance(order, ArchivedOrder),
+    ]
+
+
+def _line_values(line) -> list:
+    variations = ', '.join(f'{variation.category}: {variation.value}' for variation in line.variation.all())
+    return [line.product.title, variations, line.quantity, line.product_price]
+
+
+def csv_rows(querysets: Iterable[QuerySet], batch_size: int = BATCH_SIZE) -> Iterator[str]:
+    """Yield a CSV export of orders, one row per order line.
+
+    Orders without lines get a single row with empty line columns.
+
+    Args:
+        querysets (Iterable[QuerySet]): The live and archived orders to export, see `iter_orders`.
+        batch_size (int, optional): Number of orders loaded at a time.
+
+    Yields:
+        str: The CSV lines, starting with the header.
+    """
+    writer = csv.writer(Echo())
+    yield writer.writerow(ORDER_COLUMNS + LINE_COLUMNS)
+
+    for order, lines in iter_orders(querysets, batch_size):
+        order_values = _order_values(order)
+
+        if not lines:
+            yield writer.writerow(order_values + [''] * len(LINE_COLUMNS))
+
+        for line in lines:
+            yield writer.writerow(order_values + _line_values(line))
+
+
+def jsonl_rows(querysets: Iterable[QuerySet], batch_size: int = BATCH_SIZE) -> Iterator[str]:
+    """Yield a JSON Lines export of orders, one object per order with its lines nested.
+
+    Args:
+        querysets (Iterable[QuerySet]): The live and archived orders to export, see `iter_orders`.
+        batch_size (int, optional): Number of orders loaded at a time.
+
+    Yields:
+        str: The JSON lines.
+    """
+    for order, lines in iter_orders(querysets, batch_size):
+        data = dict(zip(ORDER_COLUMNS, _order_values(order)))
+        data['lines'] = [dict(zip(LINE_COLUMNS, _line_values(line))) for line in lines]
+        yield json.dumps(data, cls=DjangoJSONEncoder) + '\n'
+
+
+# Export format name: (row generator, content type)
+EXPORT_FORMATS = {
+    'csv': (csv_rows, 'text/csv'),
+    'jsonl': (jsonl_rows, 'application/x-ndjson'),
+}
@@ -0,0 +1,60 @@
+import time
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandParser
+from django.utils import timezone
+from orders.archive import ARCHIVE_AFTER_DAYS, BATCH_SIZE, archivable_order_ids, archive_orders
+
+
+BATCH_SLEEP: float = 0.1
+
+
+class Command(BaseCommand):
+    """Move old completed and cancelled orders to the archive tables.
+
+    Orders are moved in batches, each in its own short transaction, so the command can
+    run on a schedule against a busy database. Archived orders are still shown in the
+    order history of their users.
+    """
+    help = 'Move old completed orders with their lines to the archive tables in batches.'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument('--days', type=int, default=ARCHIVE_AFTER_DAYS,
+                            help='Archive orders created more than this many days ago.')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                            help='Maximum number of orders archived per batch.')
+        parser.add_argument('--sleep', type=float, default=BATCH_SLEEP,
+                            help='Seconds to pause between batches.')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only report how many orders would be archived.')
+
+    def handle(self, *args, **options) -> None:
+        before = timezone.now() - timedelta(days=options['days'])
+        last_id = 0
+        total = 0
+        batch = 0
+
+        while True:
+            order_ids = archivable_order_ids(before, last_id, options['batch_size'])
+            if not order_ids:
+                break
+
+            last_id = order_ids[-1]
+
+            if options['dry_run']:
+                total += len(order_ids)
+                continue
+
+            started = time.monotonic()
+            archived = archive_orders(order_ids, before)
+            elapsed = (time.monotonic() - started) * 1000
+
+            batch += 1
+            total += archived
+            self.stdout.write(f'batch {batch} archived {archived} orders in {elapsed:.1f} ms')
+
+            time.sleep(options['sleep'])
+
+        if options['dry_run']:
+            self.stdout.write(f'{total} orders would be archived')
+        else:
+            self.stdout.write(f'Archived {total} orders')
@@ -0,0 +1,31 @@
+import requests
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+from orders.models import Order
+from orders.webhooks import FakePaymentProvider
+
+
+WEBHOOK_URL: str = 'http://localhost:8000/orders/webhooks/fake/'
+
+
+class Command(BaseCommand):
+    """Send a signed payment event for an order to the payment webhook, like a provider would."""
+    help = 'Send a signed fake payment event for an order to the payment webhook.'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument('order_number', help='The number of the order to pay.')
+        parser.add_argument('--url', default=WEBHOOK_URL, help='The webhook URL.')
+        parser.add_argument('--event-id', help='The event ID, to test deduplication. Defaults to a random one.')
+        parser.add_argument('--amount', help='The paid amount. Defaults to the order total.')
+
+    def handle(self, *args, **options) -> None:
+        try:
+            order = Order.objects.get(order_number=options['order_number'])
+        except Order.DoesNotExist:
+            raise CommandError(f'Order {options["order_number"]} does not exist.')
+
+        provider = FakePaymentProvider()
+        event = provider.event(order, event_id=options['event_id'], amount=options['amount'])
+        request = provider.signed_request(event)
+
+        response = requests.post(options['url'], data=request['body'], headers=request['headers'], timeout=10)
+        self.stdout.write(f'{event["id"]}: {response.status_code} {response.text}')
@@ -0,0 +1,45 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+from django.utils import timezone
+from orders.models import Order
+from orders.status import BATCH_SIZE, TRANSITIONS, source_statuses, transition_orders
+
+
+class Command(BaseCommand):
+    """Move paid orders to another status in bulk, following the allowed transitions."""
+    help = 'Move paid orders to another status in bulk, e.g. complete accepted orders older than 14 days.'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument('to_status', choices=list(TRANSITIONS), help='The new status.')
+        parser.add_argument('--from', dest='from_status', choices=list(TRANSITIONS),
+                            help='Only move orders with this status.')
+        parser.add_argument('--older-than-days', type=int,
+                            help='Only move orders created more than this many days ago.')
+        parser.add_argument('--order-number', action='append', dest='order_numbers',
+                            help='Only move this order. Can be repeated.')
+        parser.add_argument('--note', default='', help='Why the status is changed, stored in the audit trail.')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                            help='Number of orders updated per statement.')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only report how many orders would be moved.')
+
+    def handle(self, *args, **options) -> None:
+        to_status = options['to_status']
+        orders = Order.objects.filter(is_ordered=True)
+
+        if options['from_status']:
+            if options['from_status'] not in source_statuses(to_status):
+                raise CommandError(f'Orders cannot move from {options["from_status"]} to {to_status}.')
+            orders = orders.filter(status=options['from_status'])
+        if options['older_than_days'] is not None:
+            orders = orders.filter(created_at__lt=timezone.now() - timedelta(days=options['older_than_days']))
+        if options['order_numbers']:
+            orders = orders.filter(order_number__in=options['order_numbers'])
+
+        if options['dry_run']:
+            movable = orders.filter(status__in=source_statuses(to_status)).count()
+            self.stdout.write(f'{movable} orders would be moved to {to_status}')
+            return
+
+        moved, skipped = transition_orders(orders, to_status, note=options['note'], batch_size=options['batch_size'])
+        self.stdout.write(f'{moved} orders moved to {to_status}, {skipped} skipped')
@@ -0,0 +1,28 @@
+# Generated by Django 4.1.7 on 2026-10-19 00:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0006_order_history_summary'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='order',
+            name='order_total',
+            field=models.DecimalField(decimal_places=2, max_digits=10),
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='tax',
+            field=models.DecimalField(decimal_places=2, max_digits=10),
+        ),
+        migrations.AlterField(
+            model_name='payment',
+            name='amount_paid',
+            field=models.DecimalField(decimal_places=2, max_digits=10),
+        ),
+    ]
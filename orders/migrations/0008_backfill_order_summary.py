@@ -0,0 +1,47 @@
+from django.db import migrations, transaction
+from django.db.models import F, Sum
+
+
+BATCH_SIZE = 500
+
+
+def backfill_order_summary(apps, schema_editor):
+    """Store the subtotal and item count of orders paid before they were persisted.
+
+    Orders are processed in batches by id, each batch in its own short transaction.
+    """
+    Order = apps.get_model('orders', 'Order')
+    OrderProduct = apps.get_model('orders', 'OrderProduct')
+    last_id = 0
+
+    while True:
+        order_ids = list(Order.objects.filter(id__gt=last_id, is_ordered=True, item_count=0)
+                                      .order_by('id')
+                                      .values_list('id', flat=True)[:BATCH_SIZE])
+        if not order_ids:
+            break
+
+        summaries = (OrderProduct.objects.filter(order_id__in=order_ids)
+                                         .values('order_id')
+                                         .annotate(sub_total=Sum(F('product_price') * F('quantity')),
+                                                   item_count=Sum('quantity')))
+
+        with transaction.atomic():
+            Order.objects.bulk_update([
+                Order(id=summary['order_id'], sub_total=summary['sub_total'], item_count=summary['item_count'])
+                for summary in summaries
+            ], ['sub_total', 'item_count'])
+
+        last_id = order_ids[-1]
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('orders', '0007_decimal_money_fields'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_order_summary, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.1.7 on 2026-10-19 00:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0008_backfill_order_summary'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='orderproduct',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+    ]
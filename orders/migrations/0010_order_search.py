@@ -0,0 +1,42 @@
+# Generated by Django 4.1.7 on 2026-10-19 00:44
+
+from django.db import migrations, models
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        schema_editor.execute(
+            'CREATE INDEX IF NOT EXISTS orders_order_search_trgm ON orders_order USING gin (search_text gin_trgm_ops)'
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS orders_order_search_trgm')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0009_orderproduct_created_at_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='search_text',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='email',
+            field=models.CharField(db_index=True, max_length=50),
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='phone',
+            field=models.CharField(db_index=True, max_length=50),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,41 @@
+from django.db import migrations, transaction
+
+
+BATCH_SIZE = 500
+SEARCH_FIELDS = ('order_number', 'first_name', 'last_name', 'email', 'phone', 'city', 'address')
+
+
+def backfill_search_text(apps, schema_editor):
+    """Fill `search_text` of existing orders, in batches by id with one short transaction each."""
+    Order = apps.get_model('orders', 'Order')
+    last_id = 0
+
+    while True:
+        orders = list(Order.objects.filter(id__gt=last_id)
+                                   .select_related('user')
+                                   .order_by('id')[:BATCH_SIZE])
+        if not orders:
+            break
+
+        for order in orders:
+            values = [getattr(order, field) for field in SEARCH_FIELDS]
+            if order.user is not None:
+                values += [order.user.email, order.user.username]
+            order.search_text = ' '.join(filter(None, values)).lower()
+
+        with transaction.atomic():
+            Order.objects.bulk_update(orders, ['search_text'])
+
+        last_id = orders[-1].id
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('orders', '0010_order_search'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_search_text, migrations.RunPython.noop),
+    ]
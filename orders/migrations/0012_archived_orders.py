@@ -0,0 +1,69 @@
+# Generated by Django 4.1.7 on 2026-10-19 00:47
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0006_alter_product_id_alter_reviewrating_id_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('orders', '0011_backfill_order_search_text'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedOrder',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('order_number', models.CharField(db_index=True, max_length=20)),
+                ('first_name', models.CharField(max_length=50)),
+                ('last_name', models.CharField(max_length=50)),
+                ('email', models.CharField(db_index=True, max_length=50)),
+                ('phone', models.CharField(db_index=True, max_length=50)),
+                ('city', models.CharField(max_length=50)),
+                ('address', models.CharField(max_length=50)),
+                ('comment', models.CharField(blank=True, max_length=255)),
+                ('order_total', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('tax', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('status', models.CharField(choices=[('New', 'New'), ('Accepted', 'Accepted'), ('Completed', 'Completed'), ('Cencelled', 'Cencelled')], default='New', max_length=10)),
+                ('ip', models.CharField(blank=True, max_length=20)),
+                ('is_ordered', models.BooleanField(default=False)),
+                ('idempotency_key', models.CharField(blank=True, max_length=64)),
+                ('item_count', models.PositiveIntegerField(default=0)),
+                ('sub_total', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('thumbnail', models.CharField(blank=True, max_length=255)),
+                ('search_text', models.TextField(blank=True, editable=False)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('payment', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='orders.payment')),
+                ('user', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedOrderProduct',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.IntegerField()),
+                ('product_price', models.DecimalField(decimal_places=2, max_digits=6)),
+                ('ordered', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(db_index=True)),
+                ('updated_at', models.DateTimeField()),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='orders.archivedorder')),
+                ('payment', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='orders.payment')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='store.product')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+                ('variation', models.ManyToManyField(blank=True, to='store.variations')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.AddIndex(
+            model_name='archivedorder',
+            index=models.Index(fields=['user', 'is_ordered', 'id'], name='orders_archivedorder_history'),
+        ),
+    ]
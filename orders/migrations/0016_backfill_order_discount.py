@@ -0,0 +1,42 @@
+from django.db import migrations, transaction
+from django.db.models import F
+
+
+BATCH_SIZE = 500
+
+
+def backfill_order_discount(apps, schema_editor):
+    """Store the discount of orders paid before it was persisted.
+
+    The grand total is the subtotal minus the discount plus tax, so the discount is
+    derived from the stored amounts. Live and archived orders are processed in batches
+    by id, each batch in its own short transaction.
+    """
+    for model_name in ('Order', 'ArchivedOrder'):
+        model = apps.get_model('orders', model_name)
+        last_id = 0
+
+        while True:
+            order_ids = list(model.objects.filter(id__gt=last_id, is_ordered=True)
+                                          .order_by('id')
+                                          .values_list('id', flat=True)[:BATCH_SIZE])
+            if not order_ids:
+                break
+
+            with transaction.atomic():
+                (model.objects.filter(id__in=order_ids, sub_total__gt=F('order_total') - F('tax'))
+                              .update(discount=F('sub_total') + F('tax') - F('order_total')))
+
+            last_id = order_ids[-1]
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('orders', '0015_order_discount'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_order_discount, migrations.RunPython.noop),
+    ]
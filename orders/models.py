@@ -1,8 +1,13 @@
 from django.db import models
+from django.core.files.storage import default_storage
 from accounts.models import Account
 from store.models import Product, Variations
 
 
+# Order fields copied into `Order.search_text`
+SEARCH_FIELDS = ('order_number', 'first_name', 'last_name', 'email', 'phone', 'city', 'address')
+
+
 class Payment(models.Model):
     """A model representing a payment made by a user.
 
@@ -10,14 +15,14 @@ class Payment(models.Model):
         user (Account): The user who made the payment.
         payment_id (str): The ID of the payment.
         payment_method (str): The method used to make the payment.
-        amount_paid (str): The amount of money paid.
+        amount_paid (Decimal): The amount of money paid.
         status (str): The status of the payment (e.g. "completed", "failed").
         created_at (datetime): The date and time the payment was created.
     """
     user = models.ForeignKey(Account, on_delete=models.CASCADE)
     payment_id = models.CharField(max_length=100)
     payment_method = models.CharField(max_length=100)
-    amount_paid = models.CharField(max_length=100)
+    amount_paid = models.DecimalField(max_digits=10, decimal_places=2)
     status = models.CharField(max_length=100)
     created_at = models.DateTimeField(auto_now_add=True)
 
@@ -25,8 +30,8 @@ class Payment(models.Model):
         return self.payment_id
     
 
-class Order(models.Model):
-    """A class representing an Order in the e-commerce platform.
+class AbstractOrder(models.Model):
+    """The fields of an order in the e-commerce platform, shared by live and archived orders.
 
     Attributes:
         user (ForeignKey): A foreign key to the Account model representing the user who placed the order.
@@ -39,11 +44,17 @@ class Order(models.Model):
         city (CharField): A string representing the city where the person who placed the order resides.
         address (CharField): A string representing the address where the person who placed the order resides.
         comment (CharField): A string representing any additional comments the person who placed the order provided.
-        order_total (FloatField): A float representing the total amount of the order.
-        tax (FloatField): A float representing the tax amount for the order.
+        order_total (DecimalField): The total amount of the order, including tax.
+        tax (DecimalField): The tax amount for the order.
         status (CharField): A string representing the current status of the order, selected from available options in STATUS.
         ip (CharField): A string representing the IP address from which the order was placed.
         is_ordered (BooleanField): A boolean indicating whether the order has been placed.
+        idempotency_key (CharField): The checkout token the order was created with, used to reuse it on retries.
+        item_count (PositiveIntegerField): The number of products in the order, written at checkout and when the order is paid.
+        discount (DecimalField): The promotion and coupon discount deducted from the order lines before tax.
+        sub_total (DecimalField): The total of the order lines before discount and tax, written at checkout and when the order is paid.
+        thumbnail (CharField): The image of the first product of the order, written when the order is paid.
+        search_text (TextField): The lowercased searchable fields of the order and its user, used by the admin search.
         created_at (DateTimeField): A datetime representing the date and time when the order was created.
         updated_at (DateTimeField): A datetime representing the date and time when the order was last updated.
     """
@@ -56,22 +67,31 @@ class Order(models.Model):
 
     user = models.ForeignKey(Account, on_delete=models.SET_NULL, null=True)
     payment = models.ForeignKey(Payment, on_delete=models.SET_NULL, blank=True, null=True)
-    order_number = models.CharField(max_length=20)
+    order_number = models.CharField(max_length=20, db_index=True)
     first_name = models.CharField(max_length=50)
     last_name = models.CharField(max_length=50)
-    email = models.CharField(max_length=50)
-    phone = models.CharField(max_length=50)
+    email = models.CharField(max_length=50, db_index=True)
+    phone = models.CharField(max_length=50, db_index=True)
     city = models.CharField(max_length=50)
     address = models.CharField(max_length=50)
     comment = models.CharField(max_length=255, blank=True)
-    order_total = models.FloatField()
-    tax = models.FloatField()
+    order_total = models.DecimalField(max_digits=10, decimal_places=2)
+    tax = models.DecimalField(max_digits=10, decimal_places=2)
+    discount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     status = models.CharField(max_length=10, choices=STATUS, default='New')
     ip = models.CharField(max_length=20, blank=True)
     is_ordered = models.BooleanField(default=False)
+    idempotency_key = models.CharField(max_length=64, blank=True)
+    item_count = models.PositiveIntegerField(default=0)
+    sub_total = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    thumbnail = models.CharField(max_length=255, blank=True)
+    search_text = models.TextField(blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        abstract = True
+
     def full_name(self) -> str:
         """Returns a formatted string representing the full name of the person who placed the order."""
         return f'{self.first_name} {self.last_name}'
@@ -80,15 +100,81 @@ class Order(models.Model):
         """Returns a formatted string representing the full address of the person who placed the order."""
         return f'{self.city}, {self.address}'
 
+    def thumbnail_url(self) -> str:
+        """Returns the URL of the order thumbnail, or an empty string if there is none."""
+        return default_storage.url(self.thumbnail) if self.thumbnail else ''
+
+    def build_search_text(self) -> str:
+        """Returns the lowercased text the admin searches orders in."""
+        values = [getattr(self, field) for field in SEARCH_FIELDS]
+        if self.user is not None:
+            values += [self.user.email, self.user.username]
+        return ' '.join(filter(None, values)).lower()
+
+    def save(self, *args, **kwargs) -> None:
+        """Save the order, refreshing `search_text` when a searchable field is saved."""
+        update_fields = kwargs.get('update_fields')
+
+        if update_fields is None or set(update_fields) & {'user', *SEARCH_FIELDS}:
+            self.search_text = self.build_search_text()
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'search_text'}
+
+        super().save(*args, **kwargs)
+
     def __str__(self) -> str:
         return self.first_name
-    
 
-class OrderProduct(models.Model):
-    """Represents a product included in an order.
+
+class Order(AbstractOrder):
+    """An order being placed or recently paid.
+
+    Completed orders are moved to `ArchivedOrder` by the `archive_orders` command, see
+    `orders.archive`.
+    """
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'idempotency_key'],
+                condition=~models.Q(idempotency_key=''),
+                name='unique_order_idempotency_key',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'is_ordered', 'id'], name='orders_order_history'),
+        ]
+
+    def lines(self) -> models.QuerySet:
+        """Returns the order lines of the order."""
+        return self.orderproduct_set.all()
+
+
+class ArchivedOrder(AbstractOrder):
+    """A completed order moved out of the `Order` table, keeping its ID.
+
+    Attributes:
+        created_at (DateTimeField): The datetime the original order was created.
+        updated_at (DateTimeField): The datetime the original order was last updated.
+        archived_at (DateTimeField): The datetime the order was archived.
+    """
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'is_ordered', 'id'], name='orders_archivedorder_history'),
+        ]
+
+    def lines(self) -> models.QuerySet:
+        """Returns the order lines of the order."""
+        return self.archivedorderproduct_set.all()
+
+
+class AbstractOrderProduct(models.Model):
+    """Represents a product included in an order, shared by live and archived order lines.
 
     Attributes:
-        order (Order): The order that contains this product.
         payment (Payment): The payment associated with this product, if any.
         user (Account): The user who placed the order.
         product (Product): The product being ordered.
@@ -99,7 +185,6 @@ class OrderProduct(models.Model):
         created_at (datetime): The date and time when this product was created.
         updated_at (datetime): The date and time when this product was last updated.
     """
-    order = models.ForeignKey(Order, on_delete=models.CASCADE)
     payment = models.ForeignKey(Payment, on_delete=models.SET_NULL, blank=True, null=True)
     user = models.ForeignKey(Account, on_delete=models.CASCADE)
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
@@ -107,8 +192,101 @@ class OrderProduct(models.Model):
     quantity = models.IntegerField()
     product_price = models.DecimalField(max_digits=6, decimal_places=2)
     ordered = models.BooleanField(default=False)
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        abstract = True
+
     def __str__(self) -> str:
         return self.product.title
+
+
+class OrderProduct(AbstractOrderProduct):
+    """A product included in an order.
+
+    Attributes:
+        order (Order): The order that contains this product.
+    """
+    order = models.ForeignKey(Order, on_delete=models.CASCADE)
+
+
+class ArchivedOrderProduct(AbstractOrderProduct):
+    """A product included in an archived order, keeping the ID of the original order line.
+
+    Attributes:
+        order (ArchivedOrder): The archived order that contains this product.
+    """
+    order = models.ForeignKey(ArchivedOrder, on_delete=models.CASCADE)
+    created_at = models.DateTimeField(db_index=True)
+    updated_at = models.DateTimeField()
+
+
+class PaymentEvent(models.Model):
+    """A payment provider webhook event, recorded as received and processed later.
+
+    Attributes:
+        provider (str): The name of the payment provider.
+        event_id (str): The ID of the event at the provider, unique per provider.
+        event_type (str): The type of the event, e.g. `payment.completed`.
+        payload (dict): The raw event.
+        status (str): The processing status of the event, selected from STATUS.
+        error (str): Why the event could not be processed.
+        received_at (datetime): The datetime the event was received.
+        processed_at (datetime): The datetime the event was processed.
+    """
+    PENDING = 'pending'
+    PROCESSED = 'processed'
+    IGNORED = 'ignored'
+    FAILED = 'failed'
+
+    STATUS = (
+        (PENDING, 'Pending'),
+        (PROCESSED, 'Processed'),
+        (IGNORED, 'Ignored'),
+        (FAILED, 'Failed'),
+    )
+
+    provider = models.CharField(max_length=50)
+    event_id = models.CharField(max_length=255)
+    event_type = models.CharField(max_length=100)
+    payload = models.JSONField()
+    status = models.CharField(max_length=10, choices=STATUS, default=PENDING, db_index=True)
+    error = models.TextField(blank=True)
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['provider', 'event_id'], name='unique_payment_event'),
+        ]
+
+    def __str__(self) -> str:
+        return f'{self.provider} {self.event_id}'
+
+
+class OrderStatusChange(models.Model):
+    """An audit record of an order status transition.
+
+    The order is referenced by ID and number without a foreign key, so the history is kept
+    when the order is archived.
+
+    Attributes:
+        order_id (int): The ID of the order.
+        order_number (str): The number of the order.
+        from_status (str): The status before the transition.
+        to_status (str): The status after the transition.
+        changed_by (Account): The user who made the transition, if any.
+        note (str): Why the status was changed.
+        created_at (datetime): The datetime of the transition.
+    """
+    order_id = models.BigIntegerField(db_index=True)
+    order_number = models.CharField(max_length=20)
+    from_status = models.CharField(max_length=10)
+    to_status = models.CharField(max_length=10)
+    changed_by = models.ForeignKey(Account, on_delete=models.SET_NULL, blank=True, null=True)
+    note = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self) -> str:
+        return f'{self.order_number}: {self.from_status} -> {self.to_status}'
@@ -0,0 +1,49 @@
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from accounts.models import Account
+from .models import ArchivedOrder, Order
+
+
+BATCH_SIZE: int = 500
+
+# Account fields copied into `Order.search_text`
+ACCOUNT_SEARCH_FIELDS = {'email', 'username'}
+
+
+def refresh_search_text(user_id: int, batch_size: int = BATCH_SIZE) -> int:
+    """Rebuild `search_text` of the live and archived orders of a user.
+
+    Args:
+        user_id (int): The ID of the user.
+        batch_size (int): Number of orders updated per query.
+
+    Returns:
+        int: The number of orders whose search text changed.
+    """
+    updated = 0
+
+    for model in (Order, ArchivedOrder):
+        orders = model.objects.filter(user_id=user_id).select_related('user').order_by('pk')
+        changed = []
+
+        for order in orders.iterator(chunk_size=batch_size):
+            search_text = order.build_search_text()
+            if order.search_text != search_text:
+                order.search_text = search_text
+                changed.append(order)
+
+        model.objects.bulk_update(changed, ['search_text'], batch_size=batch_size)
+        updated += len(changed)
+
+    return updated
+
+
+@receiver(post_save, sender=Account)
+def account_saved(sender, instance: Account, created: bool, update_fields=None, **kwargs) -> None:
+    """Refresh the search text of the orders of a user once a change of the account is committed."""
+    if created or (update_fields is not None and not ACCOUNT_SEARCH_FIELDS & set(update_fields)):
+        return
+
+    user_id = instance.pk
+    transaction.on_commit(lambda: refresh_search_text(user_id))
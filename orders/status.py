@@ -0,0 +1,88 @@
+from typing import Dict, List, Optional, Tuple
+from django.db import transaction
+from django.db.models import QuerySet
+from django.utils import timezone
+from accounts.models import Account
+from .models import Order, OrderStatusChange
+
+
+NEW = 'New'
+ACCEPTED = 'Accepted'
+COMPLETED = 'Completed'
+CANCELLED = 'Cencelled'
+
+# Allowed transitions, by current status
+TRANSITIONS: Dict[str, Tuple[str, ...]] = {
+    NEW: (ACCEPTED, CANCELLED),
+    ACCEPTED: (COMPLETED, CANCELLED),
+    COMPLETED: (),
+    CANCELLED: (),
+}
+
+BATCH_SIZE: int = 1000
+
+
+def can_transition(from_status: str, to_status: str) -> bool:
+    """Check whether an order may move from one status to another."""
+    return to_status in TRANSITIONS.get(from_status, ())
+
+
+def source_statuses(to_status: str) -> List[str]:
+    """Return the statuses an order can move to `to_status` from."""
+    return [status for status, targets in TRANSITIONS.items() if to_status in targets]
+
+
+def transition_orders(queryset: QuerySet, to_status: str, changed_by: Optional[Account] = None,
+                      note: str = '', batch_size: int = BATCH_SIZE) -> Tuple[int, int]:
+    """Move the paid orders of a queryset to a status, skipping those that cannot make the transition.
+
+    Unpaid orders, still being checked out, are skipped too. Runs in one transaction. Each batch of orders is locked, moved with a single
+    `UPDATE ... WHERE status IN (...)` and audited with one `bulk_create`.
+
+    Args:
+        queryset (QuerySet): The orders to move.
+        to_status (str): The new status.
+        changed_by (Account, optional): The user making the change.
+        note (str, optional): Why the status is changed.
+        batch_size (int, optional): Number of orders updated per statement.
+
+    Returns:
+        Tuple[int, int]: The number of moved orders and the number of skipped ones.
+
+    Raises:
+        ValueError: If `to_status` is not a known status.
+    """
+    if to_status not in TRANSITIONS:
+        raise ValueError(f'Unknown order status {to_status}.')
+
+    sources = source_statuses(to_status)
+    total = queryset.count()
+    moved = 0
+
+    with transaction.atomic():
+        orders = list(queryset.filter(is_ordered=True, status__in=sources)
+                              .select_for_update()
+                              .order_by('id')
+                              .values_list('id', 'order_number', 'status'))
+        now = timezone.now()
+
+        for start in range(0, len(orders), batch_size):
+            batch = orders[start:start + batch_size]
+
+            Order.objects.filter(id__in=[order_id for order_id, _, _ in batch], is_ordered=True, status__in=sources).update(
+                status=to_status, updated_at=now,
+            )
+            OrderStatusChange.objects.bulk_create([
+                OrderStatusChange(
+                    order_id=order_id,
+                    order_number=order_number,
+                    from_status=from_status,
+                    to_status=to_status,
+                    changed_by=changed_by,
+                    note=note,
+                )
+                for order_id, order_number, from_status in batch
+            ])
+            moved += len(batch)
+
+    return moved, total - moved
@@ -0,0 +1,29 @@
+from mailer.service import queue_email
+from tasks.queue import task
+from .models import Order, OrderProduct
+from .webhooks import process_events
+
+
+@task
+def send_order_received_email(order_id: int) -> None:
+    """Render the order received email and queue it for the mailer.
+
+    Args:
+        order_id (int): The ID of the paid order.
+    """
+    order = Order.objects.get(id=order_id)
+    order_products = OrderProduct.objects.filter(order=order).select_related('product')
+
+    queue_email(
+        'emails/order_received',
+        f'Thank you for your order #{order.order_number}',
+        [order.email],
+        {'order': order, 'order_products': order_products},
+    )
+
+
+@task
+def process_payment_events() -> None:
+    """Pay the orders of the received payment webhook events."""
+    while process_events():
+        pass
@@ -1,3 +1,95 @@
-from django.test import TestCase
+from decimal import Decimal
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from accounts.models import Account
+from carts.models import CartItem
+from category.models import Category
+from store.models import Product
+from .models import Order, OrderProduct, PaymentEvent
+from .webhooks import FakePaymentProvider, process_events
 
-# Create your tests here.
+
+@override_settings(PAYMENT_WEBHOOK_SECRET='test-secret')
+class PaymentWebhookTests(TestCase):
+    """Payment webhooks sent by `FakePaymentProvider`."""
+
+    def setUp(self) -> None:
+        self.user = Account.objects.create_user('buyer', 'buyer@example.com', 'secret123')
+        category = Category.objects.create(title='Shirts', slug='shirts')
+        self.product = Product.objects.create(title='Shirt', slug='shirt', price=20, images='shirt.jpg',
+                                              stock=10, category=category)
+        CartItem.objects.create(user=self.user, product=self.product, quantity=2)
+        self.order = Order.objects.create(
+            user=self.user, order_number='20240101001', first_name='Ann', last_name='Lee',
+            email='ann@example.com', phone='0123456789', city='Kyiv', address='Street 1',
+            order_total=Decimal('40.80'), tax=Decimal('0.80'), item_count=2, sub_total=Decimal('40.00'),
+        )
+        self.provider = FakePaymentProvider()
+        self.url = reverse('payment_webhook', args=['fake'])
+
+    def send(self, event: dict, provider: FakePaymentProvider = None):
+        request = (provider or self.provider).signed_request(event)
+        headers = {f'HTTP_{name.upper().replace("-", "_")}': value
+                   for name, value in request['headers'].items() if name != 'Content-Type'}
+        return self.client.post(self.url, request['body'], content_type='application/json', **headers)
+
+    def test_rejects_invalid_signature(self) -> None:
+        response = self.send(self.provider.event(self.order), FakePaymentProvider(secret='wrong-secret'))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(PaymentEvent.objects.exists())
+
+    def test_duplicate_event_is_recorded_once(self) -> None:
+        event = self.provider.event(self.order, event_id='evt_1')
+
+        first = self.send(event)
+        second = self.send(event)
+
+        self.assertEqual(first.json(), {'received': True, 'duplicate': False})
+        self.assertEqual(second.json(), {'received': True, 'duplicate': True})
+        self.assertEqual(PaymentEvent.objects.count(), 1)
+
+    def test_processing_pays_the_order(self) -> None:
+        self.send(self.provider.event(self.order))
+
+        self.assertEqual(process_events(), 1)
+
+        self.order.refresh_from_db()
+        self.product.refresh_from_db()
+        self.assertTrue(self.order.is_ordered)
+        self.assertEqual(self.order.payment.amount_paid, Decimal('40.80'))
+        self.assertEqual(OrderProduct.objects.get(order=self.order).quantity, 2)
+        self.assertEqual(self.product.stock, 8)
+        self.assertFalse(CartItem.objects.filter(user=self.user).exists())
+        self.assertEqual(PaymentEvent.objects.get().status, PaymentEvent.PROCESSED)
+
+    def test_changed_cart_fails_the_event(self) -> None:
+        CartItem.objects.filter(user=self.user).update(quantity=3)
+        self.send(self.provider.event(self.order))
+
+        process_events()
+
+        self.order.refresh_from_db()
+        self.assertFalse(self.order.is_ordered)
+        self.assertEqual(PaymentEvent.objects.get().status, PaymentEvent.FAILED)
+        self.assertEqual(CartItem.objects.get(user=self.user).quantity, 3)
+
+
+class OrderSearchTextTests(TestCase):
+    """`Order.search_text` follows changes of the account of the order."""
+
+    def test_account_change_refreshes_search_text(self) -> None:
+        user = Account.objects.create_user('buyer', 'buyer@example.com', 'secret123')
+        order = Order.objects.create(
+            user=user, order_number='20240101001', first_name='Ann', last_name='Lee',
+            email='ann@example.com', phone='0123456789', city='Kyiv', address='Street 1',
+            order_total=Decimal('40.80'), tax=Decimal('0.80'),
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            user.email = 'New.Buyer@example.com'
+            user.save()
+
+        order.refresh_from_db()
+        self.assertIn('new.buyer@example.com', order.search_text)
+        self.assertNotIn(' buyer@example.com', order.search_text)
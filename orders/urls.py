@@ -6,4 +6,5 @@ urlpatterns = [
     path('place_order/', views.place_order, name='place_order'),
     path('payments/', views.payments, name='payments'),
     path('order_complete/', views.order_complete, name='order_complete'),
+    path('webhooks/<slug:provider>/', views.payment_webhook, name='payment_webhook'),
 ]
\ No newline at end of file
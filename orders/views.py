@@ -1,71 +1,164 @@
 from django.shortcuts import render, redirect
-from django.http import HttpRequest, HttpResponse, HttpResponseRedirect, JsonResponse
+from django.http import HttpRequest, HttpResponse, HttpResponseBadRequest, HttpResponseRedirect, JsonResponse
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Case, F, When
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from collections import defaultdict
 from decimal import Decimal
+from typing import Dict, List
 import datetime
 import json
 from uuid import uuid4
+from accounts.stats import record_order
+from carts.backends import get_cart_store
 from carts.models import CartItem
-from carts.views import TAX_PERCATNAGE
+from carts.views import _checkout_token, _get_cart_totals, _owner_key
+from reports.rollups import floor_hour, schedule_refresh
 from .forms import OrderForm
 from .models import Order, Payment, OrderProduct
+from .tasks import send_order_received_email
+from .webhooks import record_event, verify_signature
 from store.models import Product
 
 
-def payments(request: HttpRequest) -> HttpResponse:
-    """Processes the payment for an order and saves the payment details and order details.
+def _next_order_number() -> str:
+    """Generate an order number from today's date and a sequence, before the order is inserted.
+
+    Returns:
+        str: The order number.
+    """
+    current_date = datetime.date.today().strftime('%Y%m%d')
+
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT nextval('orders_order_number_seq')")
+            return current_date + str(cursor.fetchone()[0])
+
+    # Databases without sequences fall back to the microseconds since midnight
+    now = datetime.datetime.now()
+    midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    return current_date + str((now - midnight) // datetime.timedelta(microseconds=1))
+
+
+def _finalize_order(order: Order, payment: Payment) -> List[OrderProduct]:
+    """Mark an order as paid and move the cart of its user to the order in bulk.
+
+    Must be called inside a transaction. The order summary shown in the order history is
+    stored once, order lines and their variations are inserted with `bulk_create`, the stock
+    of all sold products is decreased with a single `UPDATE` and the cart is cleared.
 
     Args:
-        request (HttpRequest): The request object that contains metadata about the request.
+        order (Order): The order being paid.
+        payment (Payment): The payment of the order.
 
     Returns:
-        HttpResponse: The response object that contains the JSON data for order number and transaction ID.
+        List[OrderProduct]: The created order lines.
     """
-    body = json.loads(request.body)
-    order = Order.objects.get(user=request.user, is_ordered=False, order_number=body['orderID'])
-    
-    payment = Payment(
-        user = request.user,
-        payment_id = uuid4(),
-        payment_method = body['paymentMethod'],
-        amount_paid = order.order_total,
-        status = body['status'],
-    )
-    payment.save()
+    # Move the cart items to Order Product Table
+    cart_items = list(CartItem.objects.filter(user_id=order.user_id)
+                                      .select_related('product')
+                                      .prefetch_related('variation'))
 
+    # Store the order summary shown in the order history
     order.payment = payment
     order.is_ordered = True
-    order.save()
-
-    # Move the cart items to Order Product Table
-    cart_items = CartItem.objects.filter(user=request.user)
-
+    order.item_count = sum(item.quantity for item in cart_items)
+    order.sub_total = sum((item.product.price * item.quantity for item in cart_items), Decimal(0))
+    order.thumbnail = cart_items[0].product.images.name if cart_items else ''
+    order.save(update_fields=['payment', 'is_ordered', 'item_count', 'sub_total', 'thumbnail', 'updated_at'])
+
+    order_products = OrderProduct.objects.bulk_create([
+        OrderProduct(
+            order=order,
+            payment=payment,
+            user_id=order.user_id,
+            product_id=item.product_id,
+            quantity=item.quantity,
+            product_price=item.product.price,
+            ordered=True,
+        )
+        for item in cart_items
+    ])
+
+    Through = OrderProduct.variation.through
+    Through.objects.bulk_create([
+        Through(orderproduct_id=order_product.id, variations_id=variation.id)
+        for order_product, item in zip(order_products, cart_items)
+        for variation in item.variation.all()
+    ])
+
+    # Reduce the quantity of the sold products
+    sold: Dict[int, int] = defaultdict(int)
     for item in cart_items:
-        order_product = OrderProduct()
-        order_product.order = order
-        order_product.payment = payment
-        order_product.user = request.user
-        order_product.product_id = item.product_id
-        order_product.quantity = item.quantity
-        order_product.product_price = item.product.price
-        order_product.ordered = True
-        order_product.save()
-
-        cart_item = CartItem.objects.get(id=item.id)
-        product_variation = cart_item.variation.all()
-        order_product = OrderProduct.objects.get(id=order_product.id)
-        order_product.variation.set(product_variation)
-        order_product.save()
-
-        # Reduce the quantity of the sold products
-        product = Product.objects.get(id=item.product_id)
-        product.stock -= item.quantity
-        product.save()
+        sold[item.product_id] += item.quantity
+
+    if sold:
+        Product.objects.filter(id__in=sold).update(stock=Case(
+            *[When(id=product_id, then=F('stock') - quantity) for product_id, quantity in sold.items()],
+            default=F('stock'),
+        ))
 
     # Clear the cart
-    CartItem.objects.filter(user=request.user).delete()
+    CartItem.objects.filter(id__in=[item.id for item in cart_items]).delete()
+
+    return order_products
+
+
+def _pay_order(order: Order, payment_id: str, payment_method: str, amount_paid: Decimal, status: str) -> Payment:
+    """Record the payment of an order and finalize it.
+
+    Must be called inside a transaction with the order locked.
+
+    Args:
+        order (Order): The unpaid order.
+        payment_id (str): The ID of the payment at the provider.
+        payment_method (str): The payment method.
+        amount_paid (Decimal): The paid amount.
+        status (str): The payment status reported by the provider.
+
+    Returns:
+        Payment: The created payment.
+    """
+    payment = Payment.objects.create(
+        user_id = order.user_id,
+        payment_id = payment_id,
+        payment_method = payment_method,
+        amount_paid = amount_paid,
+        status = status,
+    )
+
+    order_products = _finalize_order(order, payment)
+    record_order(order.user_id, order.order_total)
 
     # Send order recieved email to customer
-    # ...
+    send_order_received_email.enqueue(order.id)
+
+    # Update the sales rollups of the admin dashboard for the hours the lines were sold in
+    for hour in {floor_hour(order_product.created_at) for order_product in order_products}:
+        schedule_refresh(hour)
+
+    return payment
+
+
+def payments(request: HttpRequest) -> HttpResponse:
+    """Processes the payment for an order and saves the payment details and order details.
+
+    Args:
+        request (HttpRequest): The request object that contains metadata about the request.
+
+    Returns:
+        HttpResponse: The response object that contains the JSON data for order number and transaction ID.
+    """
+    body = json.loads(request.body)
+    owner_key = _owner_key({'user': request.user})
+    get_cart_store().flush([owner_key])
+
+    with transaction.atomic():
+        order = Order.objects.select_for_update().get(user=request.user, is_ordered=False, order_number=body['orderID'])
+        payment = _pay_order(order, uuid4(), body['paymentMethod'], order.order_total, body['status'])
+
+    get_cart_store().invalidate(owner_key)
 
     # Send order number and transaction id back to sendPaymentsData function via JsonResponse
     data = {
@@ -89,8 +182,9 @@ def place_order(request: HttpRequest, total: int = 0, quantity: int = 0) -> Http
         otherwise returns a payments page if the order is successful,
         or the checkout page with form errors if the form is invalid.
     """
-    cart_items = CartItem.objects.filter(user=request.user)
-    cart_count = cart_items.count()
+    get_cart_store().flush([_owner_key({'user': request.user})])
+    cart_items = list(CartItem.objects.filter(user=request.user).select_related('product'))
+    cart_count = len(cart_items)
 
     if cart_count <= 0:
         return redirect('store')
@@ -98,48 +192,57 @@ def place_order(request: HttpRequest, total: int = 0, quantity: int = 0) -> Http
     if request.method == 'POST':
         form = OrderForm(request.POST)
 
-        grand_total = 0
-        tax = 0
-
-        for cart_item in cart_items:
-            total += cart_item.product.price * cart_item.quantity
-            quantity += cart_item.quantity
-
-        tax = Decimal(TAX_PERCATNAGE) / 100 * total
-        grand_total = total + tax
+        totals = _get_cart_totals(cart_items, request.session.get('coupon_code'))
+        total = totals['total']
+        discount = totals['discount']
+        tax = totals['tax']
+        grand_total = totals['grand_total']
 
         if form.is_valid():
-            # Store all the billing information inside Order table
-            data = Order()
-            data.user = request.user
-            data.first_name = form.cleaned_data['first_name']
-            data.last_name = form.cleaned_data['last_name']
-            data.email = form.cleaned_data['email']
-            data.phone = form.cleaned_data['phone']
-            data.city = form.cleaned_data['city']
-            data.address = form.cleaned_data['address']
-            data.comment = form.cleaned_data['comment']
-            data.order_total = grand_total
-            data.tax = tax
-            data.ip = request.META.get('REMOTE_ADDR')
-            data.save()
-
-            # Generate order number
-            yr = int(datetime.date.today().strftime('%Y'))
-            mt = int(datetime.date.today().strftime('%m'))
-            dt = int(datetime.date.today().strftime('%d'))
-            d = datetime.date(yr, mt, dt)
-            current_date = d.strftime('%Y%m%d')
-            order_number = current_date + str(data.id)
-            data.order_number = order_number
-            data.save()
-
-            order = Order.objects.get(user=request.user, is_ordered=False, order_number=order_number)
+            # Reuse the unpaid order of a retried or double submitted checkout
+            idempotency_key = request.POST.get('idempotency_key') or _checkout_token(request, cart_items)
+            billing = {field: form.cleaned_data[field] for field in OrderForm.Meta.fields}
+            billing.update(order_total=grand_total, tax=tax, discount=discount, ip=request.META.get('REMOTE_ADDR'),
+                           item_count=totals['quantity'], sub_total=total)
+
+            order = Order.objects.filter(user=request.user, is_ordered=False, idempotency_key=idempotency_key).first()
+
+            if order is None:
+                try:
+                    with transaction.atomic():
+                        order = Order.objects.create(
+                            user=request.user,
+                            order_number=_next_order_number(),
+                            idempotency_key=idempotency_key,
+                            **billing,
+                        )
+                except IntegrityError:
+                    # A concurrent submit created the order first
+                    order = Order.objects.filter(user=request.user, is_ordered=False, idempotency_key=idempotency_key).first()
+
+                    if order is None:
+                        # The token belongs to a paid order, e.g. a stale checkout page was submitted
+                        # after the cart was filled again, so start a new order with a new token
+                        request.session.pop('checkout_tokens', None)
+                        order = Order.objects.create(
+                            user=request.user,
+                            order_number=_next_order_number(),
+                            idempotency_key=_checkout_token(request, cart_items),
+                            **billing,
+                        )
+            else:
+                changed = [field for field, value in billing.items() if getattr(order, field) != value]
+
+                if changed:
+                    for field in changed:
+                        setattr(order, field, billing[field])
+                    order.save(update_fields=changed + ['updated_at'])
 
             context = {
                 'order': order,
                 'cart_items': cart_items,
                 'total': total,
+                'discount': discount,
                 'tax': '%.2f'%tax,
                 'grand_total': '%.2f'%grand_total,
             }
@@ -153,6 +256,7 @@ def place_order(request: HttpRequest, total: int = 0, quantity: int = 0) -> Http
                 'total': total,
                 'tax': '%.2f' % tax,
                 'grand_total': '%.2f' % grand_total,
+                'idempotency_key': request.POST.get('idempotency_key', ''),
             }
 
             return render(request, 'store/checkout.html', context)
@@ -179,22 +283,45 @@ def order_complete(request: HttpRequest):
 
     try:
         order = Order.objects.get(order_number=order_number, is_ordered=True)
-        order_products = OrderProduct.objects.filter(order_id=order.id)
+        order_products = OrderProduct.objects.filter(order_id=order.id).select_related('product')
 
         payment = Payment.objects.get(payment_id=transID)
 
-        sub_total = 0
-        for item in order_products:
-            sub_total += item.product_price * item.quantity
-
         context = {
             'order': order,
             'order_products': order_products,
             'order_number': order.order_number,
             'payment_id': payment.payment_id,
             'payment': payment,
-            'sub_total': sub_total,
+            'sub_total': order.sub_total,
         }
         return render(request, 'orders/order_complete.html', context)
     except (Payment.DoesNotExist, Order.DoesNotExist):
         return redirect('home')
+
+
+@csrf_exempt
+@require_POST
+def payment_webhook(request: HttpRequest, provider: str) -> HttpResponse:
+    """Receive a signed payment event from a payment provider.
+
+    The event is only verified and recorded here, duplicates are acknowledged without
+    being stored again. Orders are paid by the `process_payment_events` task.
+
+    Args:
+        request (HttpRequest): The webhook request with a JSON event body.
+        provider (str): The name of the payment provider.
+
+    Returns:
+        HttpResponse: 400 for an invalid signature or body, otherwise a JSON acknowledgement.
+    """
+    if not verify_signature(request):
+        return HttpResponseBadRequest('Invalid signature.')
+
+    try:
+        payload = json.loads(request.body)
+        event = record_event(provider, payload)
+    except (ValueError, KeyError, TypeError):
+        return HttpResponseBadRequest('Invalid event.')
+
+    return JsonResponse({'received': True, 'duplicate': event is None})
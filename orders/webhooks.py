@@ -0,0 +1,266 @@
+import hashlib
+import hmac
+import json
+import time
+from decimal import Decimal
+from typing import Any, Dict, Optional
+from uuid import uuid4
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.http import HttpRequest
+from django.utils import timezone
+from carts.models import CartItem
+from .models import Order, PaymentEvent
+
+
+SIGNATURE_HEADER = 'X-Payment-Signature'
+TIMESTAMP_HEADER = 'X-Payment-Timestamp'
+PAYMENT_COMPLETED = 'payment.completed'
+BATCH_SIZE: int = 100
+
+
+def sign(secret: str, timestamp: str, body: bytes) -> str:
+    """Compute the signature of a webhook body.
+
+    Args:
+        secret (str): The shared webhook secret.
+        timestamp (str): The UNIX timestamp the event was sent at.
+        body (bytes): The raw request body.
+
+    Returns:
+        str: The hex encoded HMAC-SHA256 of `<timestamp>.<body>`.
+    """
+    return hmac.new(secret.encode(), timestamp.encode() + b'.' + body, hashlib.sha256).hexdigest()
+
+
+def verify_signature(request: HttpRequest) -> bool:
+    """Check the signature and timestamp headers of a webhook request.
+
+    Args:
+        request (HttpRequest): The webhook request.
+
+    Returns:
+        bool: Whether the request was signed with `PAYMENT_WEBHOOK_SECRET` within the allowed tolerance.
+    """
+    secret = settings.PAYMENT_WEBHOOK_SECRET
+    timestamp = request.headers.get(TIMESTAMP_HEADER, '')
+    signature = request.headers.get(SIGNATURE_HEADER, '')
+
+    if not secret or not timestamp.isdigit():
+        return False
+
+    if abs(time.time() - int(timestamp)) > settings.PAYMENT_WEBHOOK_TOLERANCE:
+        return False
+
+    return hmac.compare_digest(sign(secret, timestamp, request.body), signature)
+
+
+def record_event(provider: str, payload: Dict[str, Any]) -> Optional[PaymentEvent]:
+    """Store a webhook event for processing, ignoring events that were already received.
+
+    Duplicates are detected by the unique (provider, event_id) constraint, so this is a
+    single insert. A processing task is enqueued once the transaction commits.
+
+    Args:
+        provider (str): The name of the payment provider.
+        payload (Dict[str, Any]): The event with at least `id` and `type` keys.
+
+    Returns:
+        Optional[PaymentEvent]: The stored event, or None if it is a duplicate.
+    """
+    try:
+        with transaction.atomic():
+            event = PaymentEvent.objects.create(
+                provider=provider,
+                event_id=str(payload['id']),
+                event_type=str(payload['type']),
+                payload=payload,
+            )
+    except IntegrityError:
+        return None
+
+    transaction.on_commit(_schedule_processing)
+    return event
+
+
+def _schedule_processing() -> None:
+    """Enqueue a processing task unless one is already waiting."""
+    from tasks.models import Task
+    from .tasks import process_payment_events
+
+    if not Task.objects.filter(name='orders.tasks.process_payment_events', status=Task.QUEUED).exists():
+        process_payment_events.enqueue()
+
+
+def _check_cart(order: Order) -> None:
+    """Make sure the cart of the user still holds what was ordered at checkout.
+
+    The order lines are taken from the cart when the order is paid, so a cart changed
+    between checkout and the payment event would record the wrong lines and stock.
+    Orders placed before the summary was stored at checkout are not checked.
+
+    Raises:
+        ValueError: If the number of products or their total changed.
+    """
+    if not order.item_count:
+        return
+
+    cart_items = CartItem.objects.filter(user_id=order.user_id).select_related('product')
+    item_count = sum(item.quantity for item in cart_items)
+    sub_total = sum((item.product.price * item.quantity for item in cart_items), Decimal(0))
+
+    if (item_count, sub_total) != (order.item_count, order.sub_total):
+        raise ValueError(f'The cart changed since checkout: {item_count} products for {sub_total}, '
+                         f'ordered {order.item_count} for {order.sub_total}.')
+
+
+def _flush_cart(event: PaymentEvent) -> None:
+    """Write the pending cart changes of the buyer of an event to the database.
+
+    Runs before the transaction of the event, so pending changes are kept when applying
+    the event fails and rolls back.
+    """
+    from carts.backends import get_cart_store
+
+    order_number = event.payload.get('data', {}).get('order_number')
+    user_id = Order.objects.filter(order_number=order_number).values_list('user_id', flat=True).first()
+
+    if user_id is not None:
+        get_cart_store().flush([f'user:{user_id}'])
+
+
+def _apply_event(event: PaymentEvent) -> str:
+    """Apply a payment event to its order, returning the resulting event status."""
+    from carts.backends import get_cart_store
+    from carts.views import _owner_key
+    from .views import _pay_order
+
+    if event.event_type != PAYMENT_COMPLETED:
+        return PaymentEvent.IGNORED
+
+    data = event.payload.get('data', {})
+    order = Order.objects.select_for_update().filter(order_number=data.get('order_number')).first()
+
+    if order is None:
+        raise ValueError(f'Unknown order {data.get("order_number")}.')
+
+    # Already paid, e.g. through the checkout page
+    if order.is_ordered:
+        return PaymentEvent.IGNORED
+
+    amount = Decimal(str(data.get('amount')))
+    if amount != order.order_total:
+        raise ValueError(f'Paid amount {amount} does not match the order total {order.order_total}.')
+
+    owner_key = _owner_key({'user': order.user})
+    _check_cart(order)
+
+    _pay_order(order, str(data.get('payment_id', '')), data.get('method', event.provider), amount, data.get('status', 'COMPLETED'))
+    transaction.on_commit(lambda: get_cart_store().invalidate(owner_key))
+
+    return PaymentEvent.PROCESSED
+
+
+def process_events(batch_size: int = BATCH_SIZE) -> int:
+    """Process pending payment events, each in its own transaction.
+
+    Events are locked with `SKIP LOCKED`, so several workers can process them concurrently.
+    Events that cannot be applied are marked as failed with the error. The cart of the
+    buyer is flushed from the cart store before the transaction of each event.
+
+    Args:
+        batch_size (int, optional): Maximum number of events processed.
+
+    Returns:
+        int: The number of handled events.
+    """
+    handled = 0
+    taken = []
+
+    while handled < batch_size:
+        candidate = PaymentEvent.objects.filter(status=PaymentEvent.PENDING).exclude(id__in=taken).order_by('id').first()
+        if candidate is None:
+            break
+
+        _flush_cart(candidate)
+
+        with transaction.atomic():
+            event = (PaymentEvent.objects.select_for_update(skip_locked=True)
+                                         .filter(pk=candidate.pk, status=PaymentEvent.PENDING)
+                                         .first())
+            if event is None:
+                # Locked or processed by another worker
+                taken.append(candidate.pk)
+                continue
+
+            try:
+                with transaction.atomic():
+                    event.status = _apply_event(event)
+            except Exception as e:
+                event.status = PaymentEvent.FAILED
+                event.error = str(e)
+
+            event.processed_at = timezone.now()
+            event.save(update_fields=['status', 'error', 'processed_at'])
+
+        handled += 1
+
+    return handled
+
+
+class FakePaymentProvider:
+    """A local stand-in for a payment provider, producing signed webhook requests.
+
+    Used by the `send_fake_payment_event` command and in tests.
+
+    Attributes:
+        secret (str): The secret events are signed with.
+    """
+
+    def __init__(self, secret: Optional[str] = None) -> None:
+        self.secret = secret if secret is not None else settings.PAYMENT_WEBHOOK_SECRET
+
+    def event(self, order: Order, event_id: Optional[str] = None, amount: Optional[Decimal] = None,
+              event_type: str = PAYMENT_COMPLETED) -> Dict[str, Any]:
+        """Build a payment event for an order.
+
+        Args:
+            order (Order): The paid order.
+            event_id (str, optional): The event ID. Defaults to a random one.
+            amount (Decimal, optional): The paid amount. Defaults to the order total.
+            event_type (str, optional): The event type.
+
+        Returns:
+            Dict[str, Any]: The event.
+        """
+        return {
+            'id': event_id or f'evt_{uuid4().hex}',
+            'type': event_type,
+            'data': {
+                'order_number': order.order_number,
+                'payment_id': f'pay_{uuid4().hex}',
+                'method': 'fake',
+                'amount': str(order.order_total if amount is None else amount),
+                'status': 'COMPLETED',
+            },
+        }
+
+    def signed_request(self, event: Dict[str, Any]) -> Dict[str, Any]:
+        """Serialize and sign an event.
+
+        Args:
+            event (Dict[str, Any]): The event.
+
+        Returns:
+            Dict[str, Any]: The `body` bytes and the `headers` to send it with.
+        """
+        body = json.dumps(event).encode()
+        timestamp = str(int(time.time()))
+        return {
+            'body': body,
+            'headers': {
+                'Content-Type': 'application/json',
+                TIMESTAMP_HEADER: timestamp,
+                SIGNATURE_HEADER: sign(self.secret, timestamp, body),
+            },
+        }
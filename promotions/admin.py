@@ -0,0 +1,11 @@
+from django.contrib import admin
+from .models import Promotion
+
+
+@admin.register(Promotion)
+class PromotionAdmin(admin.ModelAdmin):
+    list_display = ('title', 'kind', 'code', 'product', 'category', 'value', 'min_total', 'is_active', 'starts_at', 'ends_at')
+    list_filter = ('kind', 'is_active')
+    list_editable = ('is_active',)
+    search_fields = ('title', 'code')
+    raw_id_fields = ('product',)
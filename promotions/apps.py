@@ -0,0 +1,8 @@
+from django.apps import AppConfig
+
+
+class PromotionsConfig(AppConfig):
+    name = 'promotions'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,267 @@
+import hashlib
+from bisect import bisect_right
+from collections import defaultdict
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from django.core.cache import cache
+from django.db.models import Min, Q
+from django.utils import timezone
+from .models import Promotion
+
+
+CENT = Decimal('0.01')
+ENGINE_TIMEOUT: int = 300
+PRICING_TIMEOUT: int = 300
+VERSION_KEY: str = 'promotions:version'
+
+# A cart line is (line key, product id, category id, unit price, quantity)
+Line = Tuple[Any, int, int, Decimal, int]
+
+_engine: Optional['CompiledPromotions'] = None
+
+
+def _line_discount(promotion: Promotion, price: Decimal, quantity: int) -> Decimal:
+    """Calculate the discount of a product or category promotion on one cart line, at most the line total."""
+    line_total = price * quantity
+
+    if promotion.kind == Promotion.FIXED:
+        discount = promotion.value * quantity
+    elif promotion.kind == Promotion.BUY_X_GET_Y:
+        # Promotions saved before validation may lack either quantity
+        if promotion.buy_quantity < 1 or promotion.get_quantity < 1:
+            return Decimal(0)
+        group = promotion.buy_quantity + promotion.get_quantity
+        discount = (quantity // group) * promotion.get_quantity * price
+    else:
+        discount = line_total * promotion.value / 100
+
+    return max(min(discount, line_total), Decimal(0)).quantize(CENT)
+
+
+def _cart_discount(promotion: Promotion, total: Decimal) -> Decimal:
+    """Calculate the discount of a cart level promotion, at most the cart total.
+
+    Buy X get Y promotions only apply to cart lines and give no cart discount.
+    """
+    if promotion.kind == Promotion.BUY_X_GET_Y:
+        return Decimal(0)
+
+    if promotion.kind == Promotion.FIXED:
+        discount = promotion.value
+    else:
+        discount = total * promotion.value / 100
+
+    return max(min(Decimal(discount), total), Decimal(0)).quantize(CENT)
+
+
+class CompiledPromotions:
+    """Active promotions indexed for fast evaluation against a cart.
+
+    Product and category promotions are looked up by id, coupons by code, and cart level
+    promotions are kept sorted by `min_total` together with the best tier reached so far,
+    so the best eligible tier is found with one bisection.
+
+    Attributes:
+        version (int): The promotions version the engine was compiled for.
+        key (str): A digest of the compiled promotions, used in pricing cache keys.
+        expires_at (datetime): When a promotion starts or ends and the engine must be recompiled.
+    """
+
+    def __init__(self, promotions: Iterable[Promotion], version: int, expires_at: datetime) -> None:
+        self.version = version
+        self.expires_at = expires_at
+        self.by_product: Dict[int, List[Promotion]] = defaultdict(list)
+        self.by_category: Dict[int, List[Promotion]] = defaultdict(list)
+        self.coupons: Dict[str, Promotion] = {}
+
+        percentage_tiers = []
+        fixed_tiers = []
+        digest = hashlib.sha1()
+
+        for promotion in promotions:
+            digest.update(f'{promotion.id}:{promotion.updated_at.isoformat()};'.encode())
+
+            if promotion.code:
+                # Buy X get Y coupons without a product or category have nothing to apply to
+                if promotion.kind != Promotion.BUY_X_GET_Y or promotion.product_id or promotion.category_id:
+                    self.coupons[promotion.code.upper()] = promotion
+            elif promotion.product_id:
+                self.by_product[promotion.product_id].append(promotion)
+            elif promotion.category_id:
+                self.by_category[promotion.category_id].append(promotion)
+            elif promotion.kind == Promotion.FIXED:
+                fixed_tiers.append(promotion)
+            elif promotion.kind != Promotion.BUY_X_GET_Y:
+                percentage_tiers.append(promotion)
+
+        self.key = digest.hexdigest()
+        self.percentage_thresholds, self.percentage_best = self._compile_tiers(percentage_tiers)
+        self.fixed_thresholds, self.fixed_best = self._compile_tiers(fixed_tiers)
+
+    @staticmethod
+    def _compile_tiers(tiers: List[Promotion]) -> Tuple[List[Decimal], List[Promotion]]:
+        """Sort cart level promotions by threshold and keep the best one reached at each step."""
+        tiers.sort(key=lambda promotion: promotion.min_total)
+        thresholds = []
+        best = []
+
+        for promotion in tiers:
+            if best and best[-1].value >= promotion.value:
+                best.append(best[-1])
+            else:
+                best.append(promotion)
+            thresholds.append(promotion.min_total)
+
+        return thresholds, best
+
+    def _best_tier(self, thresholds: List[Decimal], best: List[Promotion], total: Decimal) -> Optional[Promotion]:
+        index = bisect_right(thresholds, total)
+        return best[index - 1] if index else None
+
+    def evaluate(self, lines: Iterable[Line], coupon_code: Optional[str] = None) -> Dict[str, Any]:
+        """Evaluate the promotions against cart lines.
+
+        Each line gets the single best product, category or coupon discount, then the best
+        cart level promotion or coupon is applied to the discounted subtotal.
+
+        Args:
+            lines (Iterable[Line]): The cart lines.
+            coupon_code (str, optional): The coupon code entered by the customer.
+
+        Returns:
+            Dict[str, Any]: The `total` before discounts, the `discount`, the `line_discounts`
+            by line key and the titles of the applied `promotions`.
+        """
+        lines = list(lines)
+        coupon = self.coupons.get(coupon_code.upper()) if coupon_code else None
+        total = sum((price * quantity for _, _, _, price, quantity in lines), Decimal(0))
+
+        if coupon is not None and total < coupon.min_total:
+            coupon = None
+
+        line_discounts = {}
+        applied = {}
+
+        for key, product_id, category_id, price, quantity in lines:
+            candidates = self.by_product.get(product_id, []) + self.by_category.get(category_id, [])
+
+            if coupon is not None and (coupon.product_id == product_id or coupon.category_id == category_id):
+                candidates.append(coupon)
+
+            best_discount = Decimal(0)
+            for promotion in candidates:
+                discount = _line_discount(promotion, price, quantity)
+
+                if discount > best_discount:
+                    best_discount = discount
+                    applied[key] = promotion
+
+            if best_discount:
+                line_discounts[key] = best_discount
+
+        discounted = total - sum(line_discounts.values(), Decimal(0))
+
+        cart_candidates = [
+            self._best_tier(self.percentage_thresholds, self.percentage_best, discounted),
+            self._best_tier(self.fixed_thresholds, self.fixed_best, discounted),
+        ]
+        if coupon is not None and not coupon.product_id and not coupon.category_id:
+            cart_candidates.append(coupon)
+
+        cart_discount = Decimal(0)
+        for promotion in filter(None, cart_candidates):
+            discount = _cart_discount(promotion, discounted)
+
+            if discount > cart_discount:
+                cart_discount = discount
+                applied[None] = promotion
+
+        return {
+            'total': total,
+            'discount': total - discounted + cart_discount,
+            'line_discounts': line_discounts,
+            'promotions': sorted({promotion.title for promotion in applied.values()}),
+        }
+
+
+def compile_promotions(version: int) -> CompiledPromotions:
+    """Load the active promotions and compile them.
+
+    Args:
+        version (int): The current promotions version.
+
+    Returns:
+        CompiledPromotions: The compiled promotions.
+    """
+    now = timezone.now()
+    active = Promotion.objects.filter(
+        Q(starts_at__isnull=True) | Q(starts_at__lte=now),
+        Q(ends_at__isnull=True) | Q(ends_at__gt=now),
+        is_active=True,
+    )
+
+    # Recompile when the next promotion starts or an active one ends
+    boundaries = Promotion.objects.filter(is_active=True).aggregate(
+        next_start=Min('starts_at', filter=Q(starts_at__gt=now)),
+        next_end=Min('ends_at', filter=Q(ends_at__gt=now)),
+    )
+    expires_at = min(filter(None, [now + timedelta(seconds=ENGINE_TIMEOUT), *boundaries.values()]))
+
+    return CompiledPromotions(active, version, expires_at)
+
+
+def get_engine() -> CompiledPromotions:
+    """Return the compiled promotions of this process, recompiling them when they changed."""
+    global _engine
+
+    version = cache.get(VERSION_KEY, 0)
+
+    if _engine is None or _engine.version != version or timezone.now() >= _engine.expires_at:
+        _engine = compile_promotions(version)
+
+    return _engine
+
+
+def bump_version() -> None:
+    """Invalidate the compiled promotions of the processes sharing the default cache.
+
+    The version is kept in the default cache, so with a shared cache (see `REDIS_URL`)
+    every process recompiles on its next request. With the per-process memory cache only
+    the current process does, the others pick up the change when their compiled
+    promotions expire, after at most `ENGINE_TIMEOUT` seconds.
+    """
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, 1, None)
+
+
+def find_coupon(code: str) -> Optional[Promotion]:
+    """Return the active coupon with the given code, if any."""
+    return get_engine().coupons.get(code.upper())
+
+
+def price_cart(lines: Iterable[Line], coupon_code: Optional[str] = None) -> Dict[str, Any]:
+    """Evaluate the promotions against cart lines, memoized per cart contents.
+
+    Args:
+        lines (Iterable[Line]): The cart lines.
+        coupon_code (str, optional): The coupon code entered by the customer.
+
+    Returns:
+        Dict[str, Any]: See `CompiledPromotions.evaluate`.
+    """
+    engine = get_engine()
+    lines = sorted(lines, key=lambda line: str(line[0]))
+    cache_key = 'promotions:pricing:' + hashlib.sha1(
+        repr((engine.key, (coupon_code or '').upper(), lines)).encode()
+    ).hexdigest()
+
+    pricing = cache.get(cache_key)
+
+    if pricing is None:
+        pricing = engine.evaluate(lines, coupon_code)
+        cache.set(cache_key, pricing, PRICING_TIMEOUT)
+
+    return pricing
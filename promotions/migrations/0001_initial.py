@@ -0,0 +1,37 @@
+# Generated by Django 4.1.7 on 2026-10-19 00:33
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('store', '0006_alter_product_id_alter_reviewrating_id_and_more'),
+        ('category', '0003_alter_category_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Promotion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=100)),
+                ('kind', models.CharField(choices=[('percentage', 'Percentage off'), ('fixed', 'Fixed amount off'), ('buy_x_get_y', 'Buy X get Y'), ('threshold', 'Cart threshold tier')], default='percentage', max_length=20)),
+                ('code', models.CharField(blank=True, db_index=True, max_length=50)),
+                ('value', models.DecimalField(decimal_places=2, default=0, max_digits=8)),
+                ('buy_quantity', models.PositiveIntegerField(default=0)),
+                ('get_quantity', models.PositiveIntegerField(default=0)),
+                ('min_total', models.DecimalField(decimal_places=2, default=0, max_digits=8)),
+                ('is_active', models.BooleanField(default=True)),
+                ('starts_at', models.DateTimeField(blank=True, null=True)),
+                ('ends_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='category.category')),
+                ('product', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='store.product')),
+            ],
+        ),
+    ]
@@ -0,0 +1,82 @@
+from django.core.exceptions import ValidationError
+from django.db import models
+from category.models import Category
+from store.models import Product
+
+
+class Promotion(models.Model):
+    """A discount rule applied to carts by `promotions.engine`.
+
+    A promotion targets a product, a category or, when neither is set, the whole cart.
+    Promotions with a code are coupons and only apply when the customer enters the code.
+
+    Attributes:
+        title (str): The name of the promotion shown to the customer.
+        kind (str): The type of the discount, selected from KIND.
+        code (str): The coupon code, empty for automatic promotions.
+        product (Product): The product the promotion applies to, if any.
+        category (Category): The category the promotion applies to, if any.
+        value (Decimal): The percentage or the amount of the discount.
+        buy_quantity (int): The number of units to buy for a buy X get Y promotion.
+        get_quantity (int): The number of free units for a buy X get Y promotion.
+        min_total (Decimal): The cart subtotal required for cart level promotions and tiers.
+        is_active (bool): Whether the promotion is active.
+        starts_at (datetime): The datetime the promotion starts, if limited.
+        ends_at (datetime): The datetime the promotion ends, if limited.
+        created_at (datetime): The datetime the promotion was created.
+        updated_at (datetime): The datetime the promotion was last updated.
+    """
+    PERCENTAGE = 'percentage'
+    FIXED = 'fixed'
+    BUY_X_GET_Y = 'buy_x_get_y'
+    THRESHOLD = 'threshold'
+
+    KIND = (
+        (PERCENTAGE, 'Percentage off'),
+        (FIXED, 'Fixed amount off'),
+        (BUY_X_GET_Y, 'Buy X get Y'),
+        (THRESHOLD, 'Cart threshold tier'),
+    )
+
+    title = models.CharField(max_length=100)
+    kind = models.CharField(max_length=20, choices=KIND, default=PERCENTAGE)
+    code = models.CharField(max_length=50, blank=True, db_index=True)
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, blank=True, null=True)
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, blank=True, null=True)
+    value = models.DecimalField(max_digits=8, decimal_places=2, default=0)
+    buy_quantity = models.PositiveIntegerField(default=0)
+    get_quantity = models.PositiveIntegerField(default=0)
+    min_total = models.DecimalField(max_digits=8, decimal_places=2, default=0)
+    is_active = models.BooleanField(default=True)
+    starts_at = models.DateTimeField(blank=True, null=True)
+    ends_at = models.DateTimeField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        return self.title
+
+    def clean(self) -> None:
+        """Validate the discount of the promotion.
+
+        Raises:
+            ValidationError: If the percentage is not between 0 and 100, the fixed amount is
+                not positive, or a buy X get Y promotion has no quantities or no product or category.
+        """
+        # Cart tiers are percentages too
+        if self.kind in (self.PERCENTAGE, self.THRESHOLD) and not 0 < self.value <= 100:
+            raise ValidationError({'value': 'The percentage must be greater than 0 and at most 100.'})
+
+        if self.kind == self.FIXED and self.value <= 0:
+            raise ValidationError({'value': 'The amount must be greater than 0.'})
+
+        if self.kind == self.BUY_X_GET_Y:
+            errors = {}
+            if self.buy_quantity < 1:
+                errors['buy_quantity'] = 'Customers must buy at least one unit.'
+            if self.get_quantity < 1:
+                errors['get_quantity'] = 'Customers must get at least one free unit.'
+            if not self.product_id and not self.category_id:
+                errors['product'] = 'Buy X get Y promotions apply to a product or a category.'
+            if errors:
+                raise ValidationError(errors)
@@ -0,0 +1,11 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .engine import bump_version
+from .models import Promotion
+
+
+@receiver(post_save, sender=Promotion)
+@receiver(post_delete, sender=Promotion)
+def promotion_changed(sender, **kwargs) -> None:
+    """Make every process recompile its promotions after a change."""
+    bump_version()
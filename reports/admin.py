@@ -0,0 +1,59 @@
+from django.contrib import admin
+from django.core.exceptions import PermissionDenied
+from django.http import HttpRequest, HttpResponse
+from django.template.response import TemplateResponse
+from django.utils import timezone
+from .models import SalesRollup
+from .rollups import DAY, floor_day, sales_summary
+
+
+DASHBOARD_PERIODS = (7, 30, 90, 365, 3650)
+TOP_ROWS: int = 10
+
+
+@admin.register(SalesRollup)
+class SalesRollupAdmin(admin.ModelAdmin):
+    """Read-only sales dashboard built from the daily rollups."""
+    list_display = ('period_start', 'granularity', 'dimension', 'label', 'revenue', 'units', 'orders')
+
+    def has_add_permission(self, request: HttpRequest) -> bool:
+        return False
+
+    def has_change_permission(self, request: HttpRequest, obj=None) -> bool:
+        return False
+
+    def has_delete_permission(self, request: HttpRequest, obj=None) -> bool:
+        return False
+
+    def changelist_view(self, request: HttpRequest, extra_context=None) -> HttpResponse:
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+
+        days = request.GET.get('days', '30')
+        days = int(days) if days.isdigit() and int(days) in DASHBOARD_PERIODS else 30
+        end = floor_day(timezone.now()) + DAY
+        start = end - DAY * days
+
+        daily = list(SalesRollup.objects.filter(granularity=SalesRollup.DAY, dimension=SalesRollup.TOTAL,
+                                                period_start__gte=start, period_start__lt=end)
+                                        .order_by('period_start'))
+        totals = {
+            'revenue': sum(row.revenue for row in daily),
+            'units': sum(row.units for row in daily),
+            'orders': sum(row.orders for row in daily),
+        }
+        max_revenue = max((row.revenue for row in daily), default=0) or 1
+
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Sales',
+            'days': days,
+            'periods': DASHBOARD_PERIODS,
+            'totals': totals,
+            'daily': [(row, int(row.revenue * 100 / max_revenue)) for row in daily],
+            'products': sales_summary(SalesRollup.DAY, SalesRollup.PRODUCT, start, end)[:TOP_ROWS],
+            'categories': sales_summary(SalesRollup.DAY, SalesRollup.CATEGORY, start, end)[:TOP_ROWS],
+            **(extra_context or {}),
+        }
+        return TemplateResponse(request, 'admin/reports/sales_dashboard.html', context)
@@ -0,0 +1,53 @@
+from datetime import datetime, time
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+from django.db.models import Min
+from django.utils import timezone
+from orders.models import ArchivedOrderProduct, OrderProduct
+from reports.rollups import DAY, floor_day, refresh_days, refresh_hours
+
+
+DAYS_PER_BATCH: int = 7
+
+
+class Command(BaseCommand):
+    """Rebuild the sales rollups from the paid order lines.
+
+    Works through the history a few days at a time, each batch in its own transaction,
+    so it can backfill years of orders without long locks.
+    """
+    help = 'Rebuild the hourly and daily sales rollups from the paid order lines.'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument('--since', help='First day to rebuild (YYYY-MM-DD). Defaults to the first order.')
+        parser.add_argument('--until', help='Last day to rebuild (YYYY-MM-DD). Defaults to today.')
+        parser.add_argument('--days-per-batch', type=int, default=DAYS_PER_BATCH,
+                            help='Number of days rebuilt per transaction.')
+
+    def _parse_day(self, value: str) -> datetime:
+        try:
+            return timezone.make_aware(datetime.combine(datetime.strptime(value, '%Y-%m-%d').date(), time.min))
+        except ValueError:
+            raise CommandError(f'Invalid date {value}, expected YYYY-MM-DD.')
+
+    def handle(self, *args, **options) -> None:
+        first_sales = [model.objects.filter(ordered=True).aggregate(first=Min('created_at'))['first']
+                       for model in (ArchivedOrderProduct, OrderProduct)]
+        first_sale = min(filter(None, first_sales), default=None)
+
+        if options['since']:
+            start = self._parse_day(options['since'])
+        elif first_sale:
+            start = floor_day(first_sale)
+        else:
+            self.stdout.write('No paid orders to roll up')
+            return
+
+        end = (self._parse_day(options['until']) if options['until'] else floor_day(timezone.now())) + DAY
+        step = DAY * max(options['days_per_batch'], 1)
+
+        while start < end:
+            batch_end = min(start + step, end)
+            hours = refresh_hours(start, batch_end)
+            days = refresh_days(start, batch_end)
+            self.stdout.write(f'{start:%Y-%m-%d} - {batch_end - DAY:%Y-%m-%d}: {hours} hourly and {days} daily rows')
+            start = batch_end
@@ -0,0 +1,60 @@
+from django.db import models
+
+
+class SalesRollup(models.Model):
+    """Pre-aggregated sales of one hour or one day.
+
+    Every period has a `total` row and one row per sold product and per category, so
+    reports read a handful of rows instead of scanning `OrderProduct`. Rows are rebuilt
+    by the `reports.tasks.refresh_sales_rollups` task, which paid orders enqueue through
+    `reports.rollups.schedule_refresh`.
+
+    Attributes:
+        granularity (str): The length of the period, selected from GRANULARITY.
+        period_start (datetime): The start of the period.
+        dimension (str): What the row aggregates, selected from DIMENSION.
+        object_id (int): The ID of the product or category, 0 for totals.
+        label (str): The title of the product or category when the row was built.
+        revenue (Decimal): The revenue of the order lines before discounts and tax.
+        units (int): The number of sold units.
+        orders (int): The number of paid orders.
+        updated_at (datetime): The datetime the row was built.
+    """
+    HOUR = 'hour'
+    DAY = 'day'
+
+    GRANULARITY = (
+        (HOUR, 'Hour'),
+        (DAY, 'Day'),
+    )
+
+    TOTAL = 'total'
+    PRODUCT = 'product'
+    CATEGORY = 'category'
+
+    DIMENSION = (
+        (TOTAL, 'Total'),
+        (PRODUCT, 'Product'),
+        (CATEGORY, 'Category'),
+    )
+
+    granularity = models.CharField(max_length=4, choices=GRANULARITY)
+    period_start = models.DateTimeField()
+    dimension = models.CharField(max_length=8, choices=DIMENSION)
+    object_id = models.PositiveIntegerField(default=0)
+    label = models.CharField(max_length=255, blank=True)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    units = models.PositiveIntegerField(default=0)
+    orders = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['granularity', 'dimension', 'period_start', 'object_id'],
+                name='unique_sales_rollup',
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f'{self.get_granularity_display()} {self.period_start:%Y-%m-%d %H:%M} {self.label or self.dimension}'
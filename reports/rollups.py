@@ -0,0 +1,181 @@
+from datetime import datetime, timedelta
+from typing import List
+from django.db import transaction
+from django.db.models import Count, F, Max, QuerySet, Sum
+from django.db.models.functions import TruncDay, TruncHour
+from django.utils import timezone
+from orders.models import ArchivedOrderProduct, OrderProduct
+from .models import SalesRollup
+
+
+HOUR = timedelta(hours=1)
+DAY = timedelta(days=1)
+
+# Grouping of order lines for each dimension, as (dimension, id field, label field)
+LINE_DIMENSIONS = (
+    (SalesRollup.TOTAL, None, None),
+    (SalesRollup.PRODUCT, 'product_id', 'product__title'),
+    (SalesRollup.CATEGORY, 'product__category_id', 'product__category__title'),
+)
+
+
+def floor_hour(moment: datetime) -> datetime:
+    """Return the start of the hour of a datetime in the current timezone."""
+    return timezone.localtime(moment).replace(minute=0, second=0, microsecond=0)
+
+
+def floor_day(moment: datetime) -> datetime:
+    """Return the start of the day of a datetime in the current timezone."""
+    return timezone.localtime(moment).replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _replace(granularity: str, start: datetime, end: datetime, rows: List[SalesRollup]) -> int:
+    """Replace the rollups of a granularity between two datetimes in one transaction."""
+    with transaction.atomic():
+        SalesRollup.objects.filter(granularity=granularity, period_start__gte=start, period_start__lt=end).delete()
+        SalesRollup.objects.bulk_create(rows)
+
+    return len(rows)
+
+
+def refresh_hours(start: datetime, end: datetime) -> int:
+    """Rebuild the hourly rollups between two hour boundaries from the paid order lines.
+
+    Runs one grouped query per dimension and order line table, live and archived, however
+    many hours the range spans.
+
+    Args:
+        start (datetime): The start of the first hour.
+        end (datetime): The end of the last hour, exclusive.
+
+    Returns:
+        int: The number of stored rollup rows.
+    """
+    rows = {}
+
+    for model in (OrderProduct, ArchivedOrderProduct):
+        lines = (model.objects.filter(ordered=True, created_at__gte=start, created_at__lt=end)
+                              .annotate(period=TruncHour('created_at')))
+
+        for dimension, id_field, label_field in LINE_DIMENSIONS:
+            group_by = ['period'] + [field for field in (id_field, label_field) if field]
+            groups = lines.values(*group_by).order_by().annotate(
+                total_revenue=Sum(F('product_price') * F('quantity')),
+                total_units=Sum('quantity'),
+                total_orders=Count('order_id', distinct=True),
+            )
+
+            for group in groups:
+                key = (group['period'], dimension, group[id_field] if id_field else 0)
+                row = rows.setdefault(key, SalesRollup(
+                    granularity=SalesRollup.HOUR,
+                    period_start=key[0],
+                    dimension=dimension,
+                    object_id=key[2],
+                    label=group[label_field] if label_field else '',
+                ))
+                # An order is either live or archived, so the order counts can be added
+                row.revenue += group['total_revenue']
+                row.units += group['total_units']
+                row.orders += group['total_orders']
+
+    return _replace(SalesRollup.HOUR, start, end, list(rows.values()))
+
+
+def refresh_days(start: datetime, end: datetime) -> int:
+    """Rebuild the daily rollups between two day boundaries from the hourly rollups.
+
+    An order is paid at a single moment, so summing the hourly order counts gives the
+    daily ones.
+
+    Args:
+        start (datetime): The start of the first day.
+        end (datetime): The end of the last day, exclusive.
+
+    Returns:
+        int: The number of stored rollup rows.
+    """
+    groups = (SalesRollup.objects.filter(granularity=SalesRollup.HOUR, period_start__gte=start, period_start__lt=end)
+                                 .annotate(period=TruncDay('period_start'))
+                                 .values('period', 'dimension', 'object_id')
+                                 .order_by()
+                                 .annotate(total_revenue=Sum('revenue'),
+                                           total_units=Sum('units'),
+                                           total_orders=Sum('orders'),
+                                           title=Max('label')))
+
+    rows = [
+        SalesRollup(
+            granularity=SalesRollup.DAY,
+            period_start=group['period'],
+            dimension=group['dimension'],
+            object_id=group['object_id'],
+            label=group['title'],
+            revenue=group['total_revenue'],
+            units=group['total_units'],
+            orders=group['total_orders'],
+        )
+        for group in groups
+    ]
+
+    return _replace(SalesRollup.DAY, start, end, rows)
+
+
+def refresh_hour(moment: datetime) -> None:
+    """Rebuild the rollups of the hour and the day containing a datetime.
+
+    Rebuilding is idempotent, so running it twice or out of order gives the same rows.
+
+    Args:
+        moment (datetime): A datetime within the hour to rebuild.
+    """
+    hour = floor_hour(moment)
+    refresh_hours(hour, hour + HOUR)
+
+    day = floor_day(moment)
+    refresh_days(day, day + DAY)
+
+
+def schedule_refresh(moment: datetime) -> None:
+    """Enqueue a rebuild of the rollups of the hour containing a datetime, once the current transaction commits.
+
+    Nothing is enqueued when a rebuild of that hour is already waiting, so a burst of
+    orders in the same hour is rolled up once. The check runs after the commit, so a
+    waiting rebuild has not started yet and sees the new order lines.
+
+    Args:
+        moment (datetime): A datetime within the hour to rebuild.
+    """
+    from tasks.models import Task
+    from .tasks import refresh_sales_rollups
+
+    hour = floor_hour(moment).isoformat()
+
+    def enqueue() -> None:
+        if not Task.objects.filter(name='reports.tasks.refresh_sales_rollups', status=Task.QUEUED, args=[hour]).exists():
+            refresh_sales_rollups.enqueue(hour)
+
+    transaction.on_commit(enqueue)
+
+
+def sales_summary(granularity: str, dimension: str, start: datetime, end: datetime) -> QuerySet:
+    """Sum the rollups of a dimension between two datetimes.
+
+    Args:
+        granularity (str): The granularity of the rollups to read.
+        dimension (str): The dimension to read.
+        start (datetime): The start of the range.
+        end (datetime): The end of the range, exclusive.
+
+    Returns:
+        QuerySet: Dicts with `object_id`, `title`, `total_revenue`, `total_units` and `total_orders`, best selling first.
+    """
+    return (SalesRollup.objects.filter(granularity=granularity, dimension=dimension,
+                                       period_start__gte=start, period_start__lt=end)
+                               .values('object_id')
+                               .order_by()
+                               .annotate(title=Max('label'),
+                                         total_revenue=Sum('revenue'),
+                                         total_units=Sum('units'),
+                                         total_orders=Sum('orders'))
+                               .order_by('-total_revenue'))
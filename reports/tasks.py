@@ -0,0 +1,13 @@
+from datetime import datetime
+from tasks.queue import task
+from .rollups import refresh_hour
+
+
+@task
+def refresh_sales_rollups(hour: str) -> None:
+    """Rebuild the sales rollups of an hour and its day.
+
+    Args:
+        hour (str): The start of the hour in ISO 8601 format.
+    """
+    refresh_hour(datetime.fromisoformat(hour))
@@ -6,10 +6,9 @@ from decimal import Decimal as D
 from typing import Optional
 from .models import Product, ReviewRating
 from .forms import ReviewForm
+from accounts.stats import record_review
 from category.models import Category
-from carts.models import CartItem
-from carts.views import _cart_id
-from orders.models import OrderProduct
+from orders.models import ArchivedOrderProduct, OrderProduct
 
 
 PRODUCTS_PER_PAGE: int = 10
@@ -90,13 +89,14 @@ def product_detail(request: HttpRequest, category_slug: str, product_slug: str)
     """
     try:
         single_product = Product.objects.get(category__slug=category_slug, slug=product_slug)
-        in_cart = CartItem.objects.filter(cart__cart_id=_cart_id(request), product=single_product).exists()
+        in_cart = request.cart.contains(single_product.id)
     except Exception as e:
         raise e
     
     if request.user.is_authenticated:
         try:
-            ordered_product = OrderProduct.objects.filter(user=request.user, product_id=single_product.id).exists()
+            ordered_product = (OrderProduct.objects.filter(user=request.user, product_id=single_product.id).exists()
+                               or ArchivedOrderProduct.objects.filter(user=request.user, product_id=single_product.id).exists())
         except OrderProduct.DoesNotExist:
             ordered_product = None
     else:
@@ -182,6 +182,7 @@ def submit_review(request: HttpRequest, product_id: int) -> HttpResponse:
                 data.product_id = product_id
                 data.user_id = request.user.id
                 data.save()
+                record_review(request.user.id)
                 return redirect(url)
 
     return HttpResponse('Review sent')
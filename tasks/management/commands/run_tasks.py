@@ -0,0 +1,51 @@
+import time
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandParser
+from django.utils import timezone
+from tasks.models import Task
+from tasks.queue import claim, run
+
+
+BATCH_SIZE: int = 20
+POLL_INTERVAL: float = 1.0
+KEEP_DONE_DAYS: int = 7
+
+
+class Command(BaseCommand):
+    """Run queued background tasks.
+
+    Runs as a worker process until stopped, or drains the queue once with `--once`.
+    """
+    help = 'Run queued background tasks.'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument('--once', action='store_true',
+                            help='Exit when no task is due instead of polling.')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                            help='Maximum number of tasks claimed at a time.')
+        parser.add_argument('--interval', type=float, default=POLL_INTERVAL,
+                            help='Seconds to wait when no task is due.')
+        parser.add_argument('--keep-days', type=int, default=KEEP_DONE_DAYS,
+                            help='Delete finished tasks older than this many days on start.')
+
+    def handle(self, *args, **options) -> None:
+        deleted, _ = Task.objects.filter(
+            status=Task.DONE, updated_at__lt=timezone.now() - timedelta(days=options['keep_days']),
+        ).delete()
+        if deleted:
+            self.stdout.write(f'Deleted {deleted} finished tasks')
+
+        while True:
+            tasks = claim(options['batch_size'])
+
+            for task in tasks:
+                started = time.monotonic()
+                succeeded = run(task)
+                elapsed = (time.monotonic() - started) * 1000
+                status = 'done' if succeeded else 'failed'
+                self.stdout.write(f'{task.name} ({task.id}) {status} in {elapsed:.1f} ms')
+
+            if not tasks:
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
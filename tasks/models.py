@@ -0,0 +1,50 @@
+from django.db import models
+
+
+class Task(models.Model):
+    """A unit of background work stored in the database and run by the `run_tasks` worker.
+
+    Attributes:
+        name (str): The registered name of the task function.
+        args (list): The positional arguments of the task.
+        kwargs (dict): The keyword arguments of the task.
+        status (str): The current status of the task, selected from STATUS.
+        attempts (int): The number of times the task has been run.
+        max_attempts (int): The number of attempts after which the task is marked as failed.
+        run_at (datetime): The datetime after which the task may run.
+        locked_at (datetime): The datetime a worker claimed the task.
+        last_error (str): The traceback of the last failed attempt.
+        created_at (datetime): The datetime the task was enqueued.
+        updated_at (datetime): The datetime the task was last updated.
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+
+    STATUS = (
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    )
+
+    name = models.CharField(max_length=255)
+    args = models.JSONField(default=list, blank=True)
+    kwargs = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS, default=QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_at = models.DateTimeField()
+    locked_at = models.DateTimeField(blank=True, null=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_at'], name='tasks_task_status_run_at'),
+        ]
+
+    def __str__(self) -> str:
+        return self.name
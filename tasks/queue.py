@@ -0,0 +1,145 @@
+import logging
+import traceback
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from .models import Task
+
+
+logger = logging.getLogger(__name__)
+
+RETRY_BASE_DELAY: int = 10
+LOCK_TIMEOUT: int = 600
+
+# Recorded as the error of a task whose worker stopped while running it
+STALE_ERROR = 'The worker stopped while running the task.'
+
+REGISTRY: Dict[str, Callable] = {}
+
+
+def task(func: Callable) -> Callable:
+    """Register a function as a background task.
+
+    The function gets an `enqueue` attribute that stores a call of it in the task queue,
+    e.g. `send_email.enqueue(order_id)`. Arguments must be JSON serializable.
+
+    Args:
+        func (Callable): The task function.
+
+    Returns:
+        Callable: The same function.
+    """
+    name = f'{func.__module__}.{func.__name__}'
+    REGISTRY[name] = func
+    func.enqueue = lambda *args, **kwargs: enqueue(name, args, kwargs)
+    return func
+
+
+def enqueue(name: str, args=(), kwargs: Optional[dict] = None, run_at: Optional[datetime] = None,
+            max_attempts: int = 5) -> Task:
+    """Store a task in the queue.
+
+    When called inside a transaction the task is only visible to workers once it commits.
+
+    Args:
+        name (str): The registered name of the task function.
+        args (tuple, optional): The positional arguments of the task.
+        kwargs (dict, optional): The keyword arguments of the task.
+        run_at (datetime, optional): Do not run the task before this datetime. Defaults to now.
+        max_attempts (int, optional): The number of attempts before the task is marked as failed.
+
+    Returns:
+        Task: The created task.
+    """
+    if name not in REGISTRY:
+        raise ValueError(f'Task {name} is not registered.')
+
+    return Task.objects.create(
+        name=name,
+        args=list(args),
+        kwargs=kwargs or {},
+        run_at=run_at or timezone.now(),
+        max_attempts=max_attempts,
+    )
+
+
+def claim(batch_size: int) -> List[Task]:
+    """Lock a batch of due tasks for this worker.
+
+    Uses `SELECT ... FOR UPDATE SKIP LOCKED` where the database supports it, so several
+    workers can claim tasks concurrently without waiting on each other. Tasks left running
+    by a crashed worker are claimed again after `LOCK_TIMEOUT` seconds, counting the run
+    that never finished as an attempt, so a task that keeps killing its worker ends up
+    failed after `max_attempts` like any other failing task.
+
+    Args:
+        batch_size (int): Maximum number of tasks to claim.
+
+    Returns:
+        List[Task]: The claimed tasks.
+    """
+    now = timezone.now()
+
+    with transaction.atomic():
+        tasks = list(
+            Task.objects.select_for_update(skip_locked=True)
+            .filter(Q(status=Task.QUEUED, run_at__lte=now) |
+                    Q(status=Task.RUNNING, locked_at__lt=now - timedelta(seconds=LOCK_TIMEOUT)))
+            .order_by('run_at')[:batch_size]
+        )
+
+        stale = [task for task in tasks if task.status == Task.RUNNING]
+        for task in stale:
+            task.attempts += 1
+            task.last_error = STALE_ERROR
+
+        exhausted = {task.id for task in stale if task.attempts >= task.max_attempts}
+        tasks = [task for task in tasks if task.id not in exhausted]
+
+        Task.objects.filter(id__in=[task.id for task in stale]).update(attempts=F('attempts') + 1, last_error=STALE_ERROR)
+        Task.objects.filter(id__in=exhausted).update(status=Task.FAILED, locked_at=None, updated_at=now)
+        Task.objects.filter(id__in=[task.id for task in tasks]).update(
+            status=Task.RUNNING, locked_at=now, updated_at=now,
+        )
+
+    for task in stale:
+        if task.id in exhausted:
+            logger.error('Task %s (%s) failed: its worker stopped while running it', task.name, task.id)
+
+    return tasks
+
+
+def run(task: Task) -> bool:
+    """Run a claimed task and record the outcome, retrying with exponential backoff on errors.
+
+    Args:
+        task (Task): The claimed task.
+
+    Returns:
+        bool: Whether the task succeeded.
+    """
+    attempts = task.attempts + 1
+
+    try:
+        REGISTRY[task.name](*task.args, **task.kwargs)
+    except Exception:
+        error = traceback.format_exc()
+        logger.exception('Task %s (%s) failed', task.name, task.id)
+
+        if attempts >= task.max_attempts:
+            Task.objects.filter(id=task.id).update(
+                status=Task.FAILED, attempts=attempts, last_error=error, locked_at=None, updated_at=timezone.now(),
+            )
+        else:
+            Task.objects.filter(id=task.id).update(
+                status=Task.QUEUED, attempts=attempts, last_error=error, locked_at=None, updated_at=timezone.now(),
+                run_at=timezone.now() + timedelta(seconds=RETRY_BASE_DELAY * 2 ** (attempts - 1)),
+            )
+        return False
+
+    Task.objects.filter(id=task.id).update(
+        status=Task.DONE, attempts=attempts, locked_at=None, updated_at=timezone.now(),
+    )
+    return True